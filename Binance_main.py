@@ -4,18 +4,27 @@ from logging_config import setup_logging
 import traceback
 
 from binance_c2c import main_binance_c2c
+from binance_db_migrations import migrate_database, ADS_DB_MIGRATIONS
+from ads_database import DB_PATH as ADS_DB_PATH, ads_repository
 from binance_update_ads import start_update_ads
+from common_utils import ServerTimestampCache
+from common_utils_http import close_http_session
 from populate_database import populate_ads_with_details
 
 setup_logging(log_filename='Binance_c2c_logger.log')
 logger = logging.getLogger(__name__)
 asyncio.get_event_loop().set_debug(True)
 
+async def hydrate_then_update_ads():
+    # Repricing needs the hydrated ratios; chat handling does not, so it starts without waiting.
+    await populate_ads_with_details()
+    await start_update_ads()
+
 async def main():
     tasks = []
     try:
         tasks.append(asyncio.create_task(main_binance_c2c()))
-        tasks.append(asyncio.create_task(start_update_ads()))
+        tasks.append(asyncio.create_task(hydrate_then_update_ads()))
         await asyncio.gather(*tasks)
     except Exception as e:
         tb_str = traceback.format_exception(etype=type(e), value=e, tb=e.__traceback__)
@@ -27,9 +36,12 @@ async def main():
         for task in tasks:
             if not task.done():
                 task.cancel()
+        await close_http_session()
+        await ads_repository.close()
 
 async def run():
-    await populate_ads_with_details()
+    await ServerTimestampCache.start()
+    await migrate_database(ADS_DB_PATH, ADS_DB_MIGRATIONS)
     await main()
 
 if __name__ == "__main__":
@@ -1,5 +1,5 @@
 import json
-import aiosqlite
+import time
 import logging
 import asyncio
 from logging_config import setup_logging
@@ -7,102 +7,175 @@ setup_logging(log_filename='Binance_c2c_logger.log')
 logger = logging.getLogger(__name__)
 from common_vars import ads_dict
 from common_utils_db import print_table_contents, create_connection
+from binance_models import Ad, AD_COLUMNS
 
 DB_PATH = 'C:/Users/p7016/Documents/bpa/ads_data.db'
 
-async def create_database():
-    async with aiosqlite.connect(DB_PATH) as conn:
-        await conn.execute('''
-            CREATE TABLE IF NOT EXISTS ads (
-                advNo TEXT PRIMARY KEY,
-                target_spot INTEGER NOT NULL,
-                asset_type TEXT NOT NULL,
-                price REAL,
-                floating_ratio REAL,
-                last_updated TIMESTAMP,
-                account TEXT NOT NULL,
-                surplused_amount REAL DEFAULT 0,
-                fiat TEXT NOT NULL DEFAULT 'Unknown',
-                transAmount REAL,
-                payTypes TEXT NOT NULL DEFAULT '[]',
-                `Group` TEXT NOT NULL DEFAULT 'Unknown',
-                merchant_id INTEGER REFERENCES merchants(id) 
-            )
-        ''')
-        await conn.commit()
+SQL_CREATE_ADS_TABLE = """CREATE TABLE IF NOT EXISTS ads (
+                            advNo TEXT PRIMARY KEY,
+                            target_spot INTEGER NOT NULL,
+                            asset_type TEXT NOT NULL,
+                            price REAL,
+                            floating_ratio REAL,
+                            last_updated TIMESTAMP,
+                            account TEXT NOT NULL,
+                            surplused_amount REAL DEFAULT 0,
+                            fiat TEXT NOT NULL DEFAULT 'Unknown',
+                            transAmount REAL,
+                            payTypes TEXT NOT NULL DEFAULT '[]',
+                            `Group` TEXT NOT NULL DEFAULT 'Unknown',
+                            merchant_id INTEGER REFERENCES merchants(id)
+                            );"""
+
+SQL_UPDATE_AD = """
+    UPDATE ads
+    SET target_spot = ?, asset_type = ?, price = ?, floating_ratio = ?, last_updated = datetime('now'), account = ?, surplused_amount = ?, fiat = ?, transAmount = ?
+    WHERE advNo = ?"""
+
+SQL_INSERT_AD = """INSERT OR REPLACE INTO ads (advNo, target_spot, asset_type, account, fiat, transAmount, payTypes, `Group`)
+                   VALUES (?, ?, ?, ?, ?, ?, ?, ?)"""
+
+def parse_pay_types(pay_types):
+    # Only a non-empty JSON list counts; anything else is treated as no payTypes filter.
+    if pay_types and pay_types not in ['null', ''] and pay_types.strip().startswith('['):
+        return json.loads(pay_types)
+    return None
 
+SQL_SELECT_ADS = f"SELECT {', '.join(f'`{column}`' for column in AD_COLUMNS)} FROM ads"
+
+def ad_row_factory(cursor, row):
+    """Row factory for SQL_SELECT_ADS."""
+    return Ad(*row[:10], parse_pay_types(row[10]), row[11])
+
+class AdsRepository:
+    """The ads table loaded once into memory, behind one long-lived connection.
+
+    Reads are served from memory; every write goes to the database first and is
+    then applied to the in-memory copy.
+    """
+
+    def __init__(self, db_path=None):
+        self.db_path = db_path
+        self.conn = None
+        self.ads = {}
+        self._lock = asyncio.Lock()
+
+    async def _ensure_open(self):
+        if self.conn is not None:
+            return
+        async with self._lock:
+            if self.conn is not None:
+                return
+            conn = await create_connection(self.db_path or DB_PATH)
+            if conn is None:
+                raise ConnectionError(f"Could not open {self.db_path or DB_PATH}")
+            await conn.execute("PRAGMA journal_mode=WAL")
+            await conn.execute("PRAGMA busy_timeout=5000")
+            self.conn = conn
+            await self._load()
+
+    async def _load(self):
+        async with self.conn.execute(SQL_SELECT_ADS) as cursor:
+            cursor.row_factory = ad_row_factory
+            self.ads = {ad.advNo: ad for ad in await cursor.fetchall()}
+        logger.debug(f"Loaded {len(self.ads)} ads")
+
+    async def reload(self):
+        """Re-read the table, e.g. after another process changed it."""
+        await self._ensure_open()
+        async with self._lock:
+            await self._load()
+
+    async def all_ads(self):
+        await self._ensure_open()
+        return [ad.copy() for ad in self.ads.values()]
+
+    async def get(self, advNo):
+        await self._ensure_open()
+        ad = self.ads.get(advNo)
+        return ad.copy() if ad else None
+
+    async def update_many(self, updates):
+        """Apply update_ad_in_database-style updates (dicts of its keyword arguments) in one transaction."""
+        if not updates:
+            return
+        await self._ensure_open()
+        async with self._lock:
+            try:
+                await self.conn.executemany(SQL_UPDATE_AD, [
+                    (u['target_spot'], u['asset_type'], u['price'], u['floating_ratio'], u['account'], u['surplusAmount'], u['fiat'], u['transAmount'], u['advNo'])
+                    for u in updates])
+                await self.conn.commit()
+            except Exception:
+                await self.conn.rollback()
+                raise
+            last_updated = time.strftime('%Y-%m-%d %H:%M:%S', time.gmtime())
+            for u in updates:
+                ad = self.ads.get(u['advNo'])
+                if ad is not None:
+                    ad.target_spot, ad.asset_type, ad.price, ad.floating_ratio = u['target_spot'], u['asset_type'], u['price'], u['floating_ratio']
+                    ad.last_updated, ad.account, ad.surplused_amount = last_updated, u['account'], u['surplusAmount']
+                    ad.fiat, ad.transAmount = u['fiat'], u['transAmount']
+
+    async def insert_many(self, ads_list):
+        await self._ensure_open()
+        async with self._lock:
+            try:
+                await self.conn.executemany(SQL_INSERT_AD, [
+                    (ad['advNo'], ad['target_spot'], ad['asset_type'], ad['account'], ad['fiat'], ad['transAmount'], ad['payTypes'], ad['Group'])
+                    for ad in ads_list])
+                await self.conn.commit()
+            except Exception:
+                await self.conn.rollback()
+                raise
+            # INSERT OR REPLACE resets the other columns, so re-read rather than patch.
+            await self._load()
+
+    async def clear(self):
+        await self._ensure_open()
+        async with self._lock:
+            await self.conn.execute("DELETE FROM ads")
+            await self.conn.commit()
+            self.ads.clear()
+
+    async def close(self):
+        if self.conn is not None:
+            await self.conn.close()
+            self.conn = None
+            self.ads = {}
+
+ads_repository = AdsRepository()
 
 async def clear_ads_table():
-    async with aiosqlite.connect(DB_PATH) as conn:
-        await conn.execute("DELETE FROM ads")
-        await conn.commit()
-
+    await ads_repository.clear()
 
 async def fetch_all_ads_from_database():
-    async with aiosqlite.connect(DB_PATH) as conn:
-        c = await conn.cursor()
-        await c.execute("SELECT * FROM ads")
-        ads = await c.fetchall()
-    return [
-        {
-            'advNo': ad[0],
-            'target_spot': ad[1],
-            'asset_type': ad[2],
-            'price': ad[3],
-            'floating_ratio': ad[4],
-            'last_updated': ad[5],
-            'account': ad[6],
-            'surplused_amount': ad[7],
-            'fiat': ad[8],
-            'transAmount': ad[9],
-            # Check if ad[10] is a valid non-empty JSON string; otherwise, set to None
-            'payTypes': json.loads(ad[10]) if ad[10] and ad[10] not in ['null', ''] and ad[10].strip().startswith('[') else None,
-            'Group': ad[11]  # Include Group
-        }
-        for ad in ads
-    ]
+    return await ads_repository.all_ads()
 
 async def get_ad_from_database(advNo):
-    async with aiosqlite.connect(DB_PATH) as conn:
-        c = await conn.cursor()
-        await c.execute("SELECT * FROM ads WHERE advNo=?", (advNo,))
-        ad = await c.fetchone()
-    if ad:
-        return {
-            'advNo': ad[0],
-            'target_spot': ad[1],
-            'asset_type': ad[2],
-            'price': ad[3],
-            'floating_ratio': ad[4],
-            'last_updated': ad[5],
-            'account': ad[6],
-            'surplused_amount': ad[7],
-            'fiat': ad[8],
-            'transAmount': ad[9],
-            'payTypes': json.loads(ad[10]) if ad[10] is not None else None,  # Deserialize or set to None
-            'Group': ad[11]  # Include Group
-        }
-
-    return None
+    return await ads_repository.get(advNo)
 
 async def update_ad_in_database(target_spot, advNo, asset_type, floating_ratio, price, surplusAmount, account, fiat, transAmount):
     logger.debug(f"Attempting to update {advNo} with price: {price}, floating_ratio: {floating_ratio}, asset_type: {asset_type}, target_spot: {target_spot}, fiat: {fiat}, transAmount: {transAmount}")
-
-    async with aiosqlite.connect(DB_PATH) as conn:
-        c = await conn.cursor()
-        try:
-            # Update only specific fields without changing payTypes and Group
-            await c.execute("""
-                UPDATE ads
-                SET target_spot = ?, asset_type = ?, price = ?, floating_ratio = ?, last_updated = datetime('now'), account = ?, surplused_amount = ?, fiat = ?, transAmount = ?
-                WHERE advNo = ?""", 
-                (target_spot, asset_type, price, floating_ratio, account, surplusAmount, fiat, transAmount, advNo))
-            await conn.commit()
-
-            logger.debug(f"Updated ad {advNo} successfully without modifying payTypes and Group.")
-        except Exception as e:
-            logger.error(f"Exception during updating ad {advNo}: {e}")
-
+    try:
+        # Update only specific fields without changing payTypes and Group
+        await ads_repository.update_many([{
+            'target_spot': target_spot, 'advNo': advNo, 'asset_type': asset_type, 'floating_ratio': floating_ratio, 'price': price,
+            'surplusAmount': surplusAmount, 'account': account, 'fiat': fiat, 'transAmount': transAmount}])
+        logger.debug(f"Updated ad {advNo} successfully without modifying payTypes and Group.")
+    except Exception as e:
+        logger.error(f"Exception during updating ad {advNo}: {e}")
+
+async def update_ads_in_database(updates):
+    """Apply many update_ad_in_database updates in one transaction.
+
+    Each update is a dict with update_ad_in_database's keyword arguments.
+    """
+    try:
+        await ads_repository.update_many(updates)
+        logger.debug(f"Updated {len(updates)} ads in one transaction")
+    except Exception as e:
+        logger.error(f"Exception during batch update of {len(updates)} ads: {e}")
 
 async def insert_initial_ads():
     ads_to_insert = []
@@ -122,28 +195,17 @@ async def insert_initial_ads():
     await insert_multiple_ads(ads_to_insert)
 
 async def insert_multiple_ads(ads_list):
-    async with aiosqlite.connect(DB_PATH) as conn:
-        c = await conn.cursor()
-        for ad in ads_list:
-            await c.execute(
-                """INSERT OR REPLACE INTO ads (advNo, target_spot, asset_type, account, fiat, transAmount, payTypes, `Group`) 
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)""",  # Include Group in the SQL command
-                (
-                    ad['advNo'], ad['target_spot'], ad['asset_type'], ad['account'],
-                    ad['fiat'], ad['transAmount'], ad['payTypes'], ad['Group']  # Pass Group to SQL execution
-                )
-            )
-        await conn.commit()
+    await ads_repository.insert_many(ads_list)
 
 async def main():
     conn = await create_connection(DB_PATH)
     if conn is not None:
         # await clear_ads_table()
-        # await create_database()
         # await insert_initial_ads()
 
         await print_table_contents(conn, 'ads')
         await conn.close()
+    await ads_repository.close()
 
 if __name__ == "__main__":
     asyncio.run(main())
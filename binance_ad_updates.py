@@ -0,0 +1,134 @@
+import asyncio
+import logging
+import time
+from ads_database import update_ad_in_database
+from binance_api import SKIPPED_AD_NUMBERS
+
+logger = logging.getLogger(__name__)
+
+AD_UPDATE_RATIO_TICK = 0.02  # smaller ratio changes are not worth an update call
+AD_UPDATE_FLUSH_INTERVAL = 1.0  # seconds
+MAX_UPDATES_PER_FLUSH = 10
+AD_UPDATE_RETRY_DELAY = 2.0  # seconds before the first retry of a failed update, doubling per attempt
+AD_UPDATE_MAX_RETRY_DELAY = 60.0  # seconds
+AD_UPDATE_MAX_ATTEMPTS = 6
+
+class PendingAdUpdate:
+    def __init__(self, ad, api_instance, ratio, price):
+        self.ad = ad
+        self.api_instance = api_instance
+        self.ratio = ratio
+        self.price = price
+        self.attempts = 0
+        self.retry_at = 0.0
+
+class AdUpdateQueue:
+    """Outbound ratio updates, coalesced per advNo and sent in periodic flushes.
+
+    Only the latest ratio submitted for an ad is sent. A ratio is recorded (in
+    confirmed_ratios and the ads table) only once Binance accepts it. A failed
+    or rejected update is kept and retried with exponential backoff, unless a
+    newer ratio for the same ad replaced it, for up to AD_UPDATE_MAX_ATTEMPTS.
+    """
+
+    def __init__(self, tick=AD_UPDATE_RATIO_TICK, flush_interval=AD_UPDATE_FLUSH_INTERVAL, max_per_flush=MAX_UPDATES_PER_FLUSH):
+        self.tick = tick
+        self.flush_interval = flush_interval
+        self.max_per_flush = max_per_flush
+        self.pending = {}
+        self.confirmed_ratios = {}
+        self.submitted = 0
+        self.coalesced = 0
+        self.suppressed = 0
+        self.confirmed = 0
+        self.failed = 0
+        self.retried = 0
+        self.abandoned = 0
+        self.skipped = 0
+
+    def submit(self, ad, api_instance, ratio, price):
+        advNo = ad.advNo
+        self.submitted += 1
+        if advNo in SKIPPED_AD_NUMBERS:
+            # update_ad would refuse it; neither a confirmation nor a failure to retry.
+            self.skipped += 1
+            return
+        current = self.confirmed_ratios.get(advNo, ad.floating_ratio)
+        if current is not None and abs(ratio - current) < self.tick:
+            self.suppressed += 1
+            # A newer value back within a tick of what Binance has cancels the queued change.
+            self.pending.pop(advNo, None)
+            logger.debug(f"Suppressed update of {advNo} to {ratio}, within {self.tick} of {current}")
+            return
+        if advNo in self.pending:
+            self.coalesced += 1
+        self.pending[advNo] = PendingAdUpdate(ad, api_instance, ratio, price)
+
+    def _retry(self, update):
+        """Put a failed update back with backoff, unless it was superseded or is out of attempts."""
+        self.failed += 1
+        advNo = update.ad.advNo
+        if advNo in self.pending:
+            return
+        if update.attempts >= AD_UPDATE_MAX_ATTEMPTS:
+            self.abandoned += 1
+            logger.error(f"Giving up on updating {advNo} to {update.ratio} after {update.attempts} attempts")
+            return
+        delay = min(AD_UPDATE_MAX_RETRY_DELAY, AD_UPDATE_RETRY_DELAY * 2 ** (update.attempts - 1))
+        update.retry_at = time.monotonic() + delay
+        self.retried += 1
+        self.pending[advNo] = update
+        logger.debug(f"Retrying update of {advNo} to {update.ratio} in {delay}s (attempt {update.attempts})")
+
+    async def _send(self, update):
+        ad = update.ad
+        advNo = ad.advNo
+        update.attempts += 1
+        response = await update.api_instance.update_ad(advNo, update.ratio)
+        if response is None:
+            # A request failure BinanceAPI has already logged; skip-list ads never get here.
+            self._retry(update)
+            return
+        if response.get('code') != '000000' or response.get('success') is False:
+            logger.error(f"Update of {advNo} to {update.ratio} was not confirmed: {response}")
+            self._retry(update)
+            return
+        self.confirmed += 1
+        self.confirmed_ratios[advNo] = update.ratio
+        await update_ad_in_database(ad.target_spot, advNo, ad.asset_type, update.ratio, update.price,
+                                    ad.surplused_amount, ad.account, ad.fiat, ad.transAmount)
+        logger.debug(f"Confirmed ratio {update.ratio} for {advNo}")
+
+    async def flush(self):
+        """Send up to max_per_flush pending updates that are not backing off; the rest wait for the next flush."""
+        now = time.monotonic()
+        ready = [advNo for advNo, update in self.pending.items() if update.retry_at <= now][:self.max_per_flush]
+        if not ready:
+            return
+        batch = [self.pending.pop(advNo) for advNo in ready]
+        results = await asyncio.gather(*(self._send(update) for update in batch), return_exceptions=True)
+        for update, result in zip(batch, results):
+            if isinstance(result, Exception):
+                logger.error(f"Update of {update.ad.advNo} failed: {result}")
+                self._retry(update)
+        logger.debug(f"Flushed {len(batch)} ad updates: {self.stats()}")
+
+    async def run(self):
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    def stats(self):
+        return {
+            'pending': len(self.pending),
+            'submitted': self.submitted,
+            'coalesced': self.coalesced,
+            'suppressed': self.suppressed,
+            'confirmed': self.confirmed,
+            'failed': self.failed,
+            'retried': self.retried,
+            'abandoned': self.abandoned,
+            'skipped': self.skipped,
+        }
+
+ad_update_queue = AdUpdateQueue()
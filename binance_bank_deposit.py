@@ -13,6 +13,57 @@ MONTHLY_LIMIT = float(os.getenv('MONTHLY_LIMIT', '70000.00'))
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Deposit timestamps are compared as ranges rather than through DATE()/strftime() so the
+# mxn_deposits indexes can serve them.
+FIND_SUITABLE_ACCOUNT_SQL = '''
+    WITH LastAccount AS (
+        SELECT account_number
+        FROM mxn_deposits
+        WHERE deposit_from = ? 
+        ORDER BY timestamp DESC
+        LIMIT 1
+    ), MostRecentlyUsedAccount AS (
+        SELECT account_number
+        FROM mxn_bank_accounts
+        ORDER BY last_used_timestamp DESC
+        LIMIT 1
+    )
+    SELECT a.account_number, a.account_bank_name
+    FROM mxn_bank_accounts a
+    LEFT JOIN (
+        SELECT account_number, SUM(amount_deposited) AS total_deposited_today
+        FROM mxn_deposits
+        WHERE timestamp >= ? AND timestamp < ?
+        GROUP BY account_number
+    ) d ON a.account_number = d.account_number
+    LEFT JOIN (
+        SELECT account_number, SUM(amount_deposited) AS total_deposited_this_month
+        FROM mxn_deposits
+        WHERE timestamp >= ? AND timestamp < ?
+        GROUP BY account_number
+    ) m ON a.account_number = m.account_number
+    WHERE (d.total_deposited_today + ? < a.account_daily_limit OR d.total_deposited_today IS NULL)
+    AND (m.total_deposited_this_month + ? < a.account_monthly_limit OR m.total_deposited_this_month IS NULL)
+    AND a.account_number NOT IN (SELECT account_number FROM LastAccount)
+    AND a.account_number NOT IN (SELECT account_number FROM MostRecentlyUsedAccount)
+    {buyer_bank_condition}
+    ORDER BY a.account_balance ASC
+'''
+
+DEPOSIT_LIMIT_SQL = '''
+    SELECT IFNULL(SUM(amount_deposited), 0)
+    FROM mxn_deposits
+    WHERE account_number = ? AND deposit_from = ? AND year = ? AND month = ?
+'''
+
+def deposit_period_bounds(now):
+    """Return [day_start, day_end) and [month_start, month_end) as SQLite timestamp strings."""
+    day = now.date()
+    next_day = day + datetime.timedelta(days=1)
+    month = day.replace(day=1)
+    next_month = (month + datetime.timedelta(days=32)).replace(day=1)
+    return tuple(d.strftime('%Y-%m-%d') for d in (day, next_day, month, next_month))
+
 async def check_deposit_limit(conn, account_number, order_no):
     """Checks if the deposit for the given account number and order number exceeds the buyer's monthly limit."""
     try:
@@ -28,13 +79,7 @@ async def check_deposit_limit(conn, account_number, order_no):
         amount_to_deposit = await get_order_amount(conn, order_no)
 
         # SQL Injection Protection: Using parameterized queries
-        query = '''
-            SELECT IFNULL(SUM(amount_deposited), 0)
-            FROM mxn_deposits
-            WHERE account_number = ? AND deposit_from = ? AND year = ? AND month = ?
-        '''
-
-        cursor = await conn.execute(query, (account_number, buyer_name, current_year, current_month))
+        cursor = await conn.execute(DEPOSIT_LIMIT_SQL, (account_number, buyer_name, current_year, current_month))
         total_deposited_this_month_row = await cursor.fetchone()
         total_deposited_this_month = total_deposited_this_month_row[0]
         # Calculate the total after the proposed deposit
@@ -55,9 +100,8 @@ async def check_deposit_limit(conn, account_number, order_no):
 async def find_suitable_account(conn, order_no, buyer_name, buyer_bank, ignore_bank_preference=False):
     """Finds suitable accounts for the given order number and buyer details."""
     try:
-        current_date = datetime.datetime.now(datetime.timezone.utc).date()
-        current_month_str = datetime.datetime.now(datetime.timezone.utc).strftime("%m")
-        current_date_str = current_date.strftime('%Y-%m-%d')
+        now = datetime.datetime.now(datetime.timezone.utc)
+        day_start, day_end, month_start, month_end = deposit_period_bounds(now)
 
         # Get the amount to deposit from the current order
         amount_to_deposit = await get_order_amount(conn, order_no)
@@ -66,42 +110,9 @@ async def find_suitable_account(conn, order_no, buyer_name, buyer_bank, ignore_b
         buyer_bank_condition = "AND LOWER(a.account_bank_name) NOT LIKE '%bbva%'" if ignore_bank_preference or buyer_bank is None else "AND LOWER(a.account_bank_name) = ?"
         logger.info(f"Buyer bank condition: {buyer_bank_condition}")
         # Parameterized query to avoid SQL Injection
-        query = f'''
-            WITH LastAccount AS (
-                SELECT account_number
-                FROM mxn_deposits
-                WHERE deposit_from = ? 
-                ORDER BY timestamp DESC
-                LIMIT 1
-            ), MostRecentlyUsedAccount AS (
-                SELECT account_number
-                FROM mxn_bank_accounts
-                ORDER BY last_used_timestamp DESC
-                LIMIT 1
-            )
-            SELECT a.account_number, a.account_bank_name
-            FROM mxn_bank_accounts a
-            LEFT JOIN (
-                SELECT account_number, SUM(amount_deposited) AS total_deposited_today
-                FROM mxn_deposits
-                WHERE DATE(timestamp) = ?
-                GROUP BY account_number
-            ) d ON a.account_number = d.account_number
-            LEFT JOIN (
-                SELECT account_number, SUM(amount_deposited) AS total_deposited_this_month
-                FROM mxn_deposits
-                WHERE strftime('%m', timestamp) = ?
-                GROUP BY account_number
-            ) m ON a.account_number = m.account_number
-            WHERE (d.total_deposited_today + ? < a.account_daily_limit OR d.total_deposited_today IS NULL)
-            AND (m.total_deposited_this_month + ? < a.account_monthly_limit OR m.total_deposited_this_month IS NULL)
-            AND a.account_number NOT IN (SELECT account_number FROM LastAccount)
-            AND a.account_number NOT IN (SELECT account_number FROM MostRecentlyUsedAccount)
-            {buyer_bank_condition}
-            ORDER BY a.account_balance ASC
-        '''
-
-        parameters = [buyer_name, current_date_str, current_month_str, amount_to_deposit, amount_to_deposit]
+        query = FIND_SUITABLE_ACCOUNT_SQL.format(buyer_bank_condition=buyer_bank_condition)
+
+        parameters = [buyer_name, day_start, day_end, month_start, month_end, amount_to_deposit, amount_to_deposit]
         # Adjust the logic to append buyer_bank.lower() only when necessary
         if not ignore_bank_preference and buyer_bank is not None:
             parameters.append(buyer_bank.lower())
@@ -1,38 +1,39 @@
 import datetime
 import asyncio
 from common_vars import bank_accounts, DB_FILE
-from common_utils_db import print_table_contents, create_connection
+from common_utils_db import print_table_contents, create_connection, commit_if_needed
 import logging
 
 logger = logging.getLogger(__name__)
 
-async def initialize_database(conn):
-    await conn.execute('''
-        CREATE TABLE IF NOT EXISTS mxn_deposits (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            timestamp DATETIME,
-            account_number TEXT,
-            amount_deposited REAL,
-            deposit_from TEXT DEFAULT NULL,
-            year INTEGER DEFAULT NULL,
-            month INTEGER DEFAULT NULL,
-            merchant_id INTEGER REFERENCES merchants(id) 
-        )
-    ''')
-
-    await conn.execute('''
-        CREATE TABLE IF NOT EXISTS mxn_bank_accounts (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            account_bank_name TEXT,
-            account_beneficiary TEXT,
-            account_number TEXT UNIQUE,
-            account_daily_limit REAL,
-            account_monthly_limit REAL,
-            account_balance REAL DEFAULT 0,
-            last_used_timestamp DATETIME DEFAULT NULL,
-            merchant_id INTEGER REFERENCES merchants(id)
-        )
-    ''')
+SQL_CREATE_MXN_DEPOSITS_TABLE = '''
+    CREATE TABLE IF NOT EXISTS mxn_deposits (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        timestamp DATETIME,
+        account_number TEXT,
+        amount_deposited REAL,
+        deposit_from TEXT DEFAULT NULL,
+        year INTEGER DEFAULT NULL,
+        month INTEGER DEFAULT NULL,
+        merchant_id INTEGER REFERENCES merchants(id) 
+    )
+'''
+
+SQL_CREATE_MXN_BANK_ACCOUNTS_TABLE = '''
+    CREATE TABLE IF NOT EXISTS mxn_bank_accounts (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        account_bank_name TEXT,
+        account_beneficiary TEXT,
+        account_number TEXT UNIQUE,
+        account_daily_limit REAL,
+        account_monthly_limit REAL,
+        account_balance REAL DEFAULT 0,
+        last_used_timestamp DATETIME DEFAULT NULL,
+        merchant_id INTEGER REFERENCES merchants(id)
+    )
+'''
+
+async def seed_bank_accounts(conn):
     for account in bank_accounts:
         # Check if the account number already exists
         cursor = await conn.execute("SELECT 1 FROM mxn_bank_accounts WHERE account_number = ?", (account['account_number'],))
@@ -68,7 +69,7 @@ async def remove_bank_account(conn, account_number):
 async def update_account_balance(conn, account_number, amount):
     try:
         await conn.execute('UPDATE mxn_bank_accounts SET account_balance = ? WHERE account_number = ?', (amount, account_number))
-        await conn.commit()
+        await commit_if_needed(conn)
         logger.debug(f"Updated account balance for account: {account_number}")
     except Exception as e:
         logger.error(f"Error updating account balance: {e}")
@@ -85,8 +86,7 @@ async def update_last_used_timestamp(conn, account_number):
             (current_timestamp, account_number)
         )
 
-        # Commit the changes to the database
-        await conn.commit()
+        await commit_if_needed(conn)
 
         # Log the successful update
         logger.debug(f"Updated last_used_timestamp for account: {account_number} to {current_timestamp}")
@@ -101,7 +101,7 @@ async def log_deposit(conn, deposit_from, bank_account_number, amount_deposited)
     await conn.execute('INSERT INTO mxn_deposits (timestamp, account_number, amount_deposited, deposit_from, year, month) VALUES (?, ?, ?, ?, ?, ?)',
                        (timestamp, bank_account_number, amount_deposited, deposit_from, year, month))
     await conn.execute('UPDATE mxn_bank_accounts SET account_balance = account_balance + ? WHERE account_number = ?', (amount_deposited, bank_account_number))
-    await conn.commit()
+    await commit_if_needed(conn)
     logger.debug(f"Logged deposit of {amount_deposited} from {deposit_from} to account {bank_account_number}")
 
 
@@ -112,8 +112,6 @@ async def sum_recent_deposits(account_number):
     twenty_four_hours_ago = datetime.datetime.now() - datetime.timedelta(days=1)
     
     try:
-        await initialize_database(conn)  # Assuming this function initializes your DB schemas
-        
         # Query to find the sum of deposits for the given account in the last 24 hours
         async with conn.execute('''
             SELECT SUM(amount_deposited) FROM mxn_deposits
@@ -137,9 +135,9 @@ async def clear_accounts(conn):
 async def main():
     conn = await create_connection(DB_FILE)
     if conn is not None:
-        # Initialize the database (create tables and insert initial data)
+        # Tables are created by binance_db_migrations; this only reloads the accounts
         await clear_accounts(conn)
-        await initialize_database(conn)
+        await seed_bank_accounts(conn)
         # Print table contents for verification
         # await remove_bank_account(conn, '0482424657')
         # await remove_bank_account(conn, '012778015323351288')
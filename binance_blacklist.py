@@ -1,23 +1,19 @@
 import asyncio
 import aiosqlite
-from common_utils_db import create_connection, print_table_contents
+from common_utils_db import create_connection, print_table_contents, commit_if_needed
 
 DB_FILE = "C:/Users/p7016/Documents/bpa/orders_data.db"
 
-async def initialize_database(conn):
-    await conn.execute(
-        """
-        CREATE TABLE IF NOT EXISTS P2PBlacklist (
-            id INTEGER PRIMARY KEY,
-            name TEXT UNIQUE,
-            order_no TEXT,
-            country TEXT,
-            response TEXT DEFAULT NULL,
-            anti_fraud_stage INTEGER DEFAULT 0
-        )
-        """
+SQL_CREATE_P2P_BLACKLIST_TABLE = """
+    CREATE TABLE IF NOT EXISTS P2PBlacklist (
+        id INTEGER PRIMARY KEY,
+        name TEXT UNIQUE,
+        order_no TEXT,
+        country TEXT,
+        response TEXT DEFAULT NULL,
+        anti_fraud_stage INTEGER DEFAULT 0
     )
-    await conn.commit()
+"""
 
 async def clear_blacklist(conn):
     await conn.execute("DELETE FROM P2PBlacklist")
@@ -30,7 +26,7 @@ async def add_to_blacklist(conn, name, order_no, country, response=None, anti_fr
             "INSERT OR IGNORE INTO P2PBlacklist (name, order_no, country, response, anti_fraud_stage) VALUES (?, ?, ?, ?, ?)", 
             (name, order_no, country, response, anti_fraud_stage)
         )
-        await conn.commit()
+        await commit_if_needed(conn)
     except aiosqlite.IntegrityError:
         pass
 
@@ -0,0 +1,104 @@
+import asyncio
+import time
+import logging
+import numpy as np
+
+logger = logging.getLogger(__name__)
+
+BOOK_PAGE_ROWS = 20
+MAX_BOOK_PAGES = 5
+PAGES_PER_ROUND = 2
+
+class BookDiff:
+    """Advertisers that appeared, disappeared or changed price between two snapshots of a book."""
+
+    def __init__(self, new, removed, repriced):
+        self.new = new
+        self.removed = removed
+        self.repriced = repriced
+
+    def __bool__(self):
+        return bool(self.new or self.removed or self.repriced)
+
+    def __repr__(self):
+        return f"BookDiff(new={len(self.new)}, removed={len(self.removed)}, repriced={len(self.repriced)})"
+
+class ColumnarBook:
+    """A book's BookEntry list as parallel NumPy columns in API rank order, with an advNo index."""
+
+    def __init__(self, ads, own_adv_nos=frozenset()):
+        self.ads = ads
+        self.adv_nos = [entry.adv_no for entry in ads]
+        self.index = {advNo: i for i, advNo in enumerate(self.adv_nos)}
+        self.prices = np.fromiter((entry.price for entry in ads), dtype=np.float64, count=len(ads))
+        self.max_amounts = np.fromiter((entry.max_amount for entry in ads), dtype=np.float64, count=len(ads))
+        self.is_own = np.zeros(len(ads), dtype=bool)
+        self.is_own[[self.index[advNo] for advNo in own_adv_nos if advNo in self.index]] = True
+
+    def __len__(self):
+        return len(self.ads)
+
+    def position(self, advNo):
+        return self.index.get(advNo)
+
+    def competitors(self, min_price, min_amount):
+        """Rank-ordered positions of other advertisers' ads priced at least min_price with at least min_amount available."""
+        return np.flatnonzero(~self.is_own & (self.prices >= min_price) & (self.max_amounts >= min_amount))
+
+class BookSnapshot:
+    def __init__(self, ads, pages):
+        self.ads = ads
+        self.pages = pages
+        self.prices = {entry.adv_no: entry.price for entry in ads}
+        self.taken_at = time.monotonic()
+        self._columns = None
+
+    def columns(self, own_adv_nos=frozenset()):
+        """The snapshot as a ColumnarBook, built once and reused while own_adv_nos is the same set."""
+        if self._columns is None or self._columns[0] is not own_adv_nos:
+            self._columns = (own_adv_nos, ColumnarBook(self.ads, own_adv_nos))
+        return self._columns[1]
+
+    def diff(self, previous):
+        if previous is None:
+            return BookDiff(set(self.prices), set(), set())
+        return BookDiff(
+            new=self.prices.keys() - previous.prices.keys(),
+            removed=previous.prices.keys() - self.prices.keys(),
+            repriced={advNo for advNo in self.prices.keys() & previous.prices.keys() if self.prices[advNo] != previous.prices[advNo]},
+        )
+
+async def fetch_book_snapshot(fetch_page, needed, qualifies, max_pages=MAX_BOOK_PAGES, pages_per_round=PAGES_PER_ROUND, rows=BOOK_PAGE_ROWS):
+    """Page through a book until it holds `needed` ads passing `qualifies`, or it runs out.
+
+    fetch_page(page) returns that page's list of BookEntry, or None on failure. The first
+    page is requested alone, so a short book costs one request; later pages are requested
+    pages_per_round at a time. Returns None when any page fails, since a truncated book
+    would diff as advertisers removed and reprice against the wrong competitors.
+    """
+    ads = []
+    seen = set()
+    qualifying = 0
+    page = 1
+    while page <= max_pages:
+        pages = range(page, min(page + (1 if page == 1 else pages_per_round), max_pages + 1))
+        results = await asyncio.gather(*(fetch_page(p) for p in pages))
+        if any(result is None for result in results):
+            logger.debug(f"Book snapshot abandoned: page {pages[results.index(None)]} failed")
+            return None
+        exhausted = False
+        for result in results:
+            for entry in result:
+                if entry.adv_no in seen:
+                    continue
+                seen.add(entry.adv_no)
+                ads.append(entry)
+                qualifying += bool(qualifies(entry))
+            if len(result) < rows:
+                exhausted = True
+                break
+        page = pages.stop
+        if exhausted or qualifying >= needed:
+            break
+    logger.debug(f"Book snapshot: {len(ads)} ads, {qualifying} qualifying, {page - 1} pages")
+    return BookSnapshot(ads, page - 1)
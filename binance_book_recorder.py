@@ -0,0 +1,40 @@
+import gzip
+import json
+import time
+import logging
+
+logger = logging.getLogger(__name__)
+
+# One gzip'd JSON line per snapshot:
+#   {"t": epoch seconds, "k": [asset, fiat, transAmount, payTypes],
+#    "o": {advNo: [floating_ratio, target_spot]} for our ads in the book,
+#    "a": [[advNo, price, dynamicMaxSingleTransAmount], ...] in rank order}
+
+class BookRecorder:
+    """Appends book snapshots to a compact gzip'd JSON-lines file for offline replay."""
+
+    def __init__(self, path):
+        self.path = path
+        self._file = gzip.open(path, 'at', encoding='utf-8')
+        self.recorded = 0
+
+    def record(self, key, snapshot, own_ads):
+        asset_type, fiat, transAmount, payTypes = key
+        line = {
+            't': round(time.time(), 3),
+            'k': [asset_type, fiat, transAmount, list(payTypes)],
+            'o': {ad.advNo: [ad.floating_ratio, ad.target_spot] for ad in own_ads},
+            'a': [[entry.adv_no, entry.price, entry.max_amount] for entry in snapshot.ads],
+        }
+        self._file.write(json.dumps(line, separators=(',', ':')) + '\n')
+        self.recorded += 1
+
+    def close(self):
+        self._file.close()
+        logger.info(f"Recorded {self.recorded} book snapshots to {self.path}")
+
+def load_recording(path):
+    """Yield the recorded snapshots in order, as dicts in the format above."""
+    with gzip.open(path, 'rt', encoding='utf-8') as f:
+        for line in f:
+            yield json.loads(line)
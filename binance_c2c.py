@@ -1,71 +1,78 @@
 
-import aiohttp
 import asyncio
 import json
+import random
+import time
 import logging
 import websockets
 
-from urllib.parse import urlencode
-
+from binance_client import get_client
+from binance_db_migrations import migrate_database, ORDERS_DB_MIGRATIONS
+from binance_dispatcher import order_dispatcher
 from binance_endpoints import GET_CHAT_CREDENTIALS
-from binance_merchant_handler import MerchantAccount
-from common_utils import get_server_timestamp, hashing
-from common_utils_db import create_connection
+from binance_chat_frames import chat_frame_filter
+from binance_inbound_events import inbound_events
+from binance_merchant_handler import merchant_account
+from binance_order_cache import order_cache
+from binance_outbox import outbound_messages
+from binance_reconcile import OrderReconciler
+from common_utils import ServerTimestampCache, server_timestamp
+from common_utils_db import get_pool, close_pools
+from common_vars import DB_FILE
 from credentials import credentials_dict
 
 logger = logging.getLogger(__name__)
 
+PING_INTERVAL = 20  # seconds between keepalive pings
+PING_TIMEOUT = 10  # seconds to wait for a pong before dropping the socket
+CHAT_CREDENTIALS_MAX_AGE = 30 * 60  # seconds a listenKey/token is used for new connections
+CHAT_CREDENTIALS_REFRESH = 20 * 60  # seconds between background refreshes, well inside the max age
+RECONNECT_BASE_BACKOFF = 1  # seconds
+RECONNECT_MAX_BACKOFF = 60  # seconds
+CIRCUIT_FAILURE_THRESHOLD = 8
+CIRCUIT_OPEN_SECONDS = 300
+
 async def send_http_request(method, url, api_key, secret_key, params=None, body=None):
-    try:
-        params = params or {}
-        params['timestamp'] = await get_server_timestamp()
-        query_string = urlencode(params)
-        signature = hashing(query_string, secret_key)
-        final_url = f"{url}?{query_string}&signature={signature}"
-        headers = {
-            "Content-Type": "application/json;charset=utf-8",
-            "X-MBX-APIKEY": api_key,
-            "clientType": "WEB"
-        }
+    response_data = await get_client(api_key, secret_key).request(method, url, params=params, body=body)
+    if not response_data or 'data' not in response_data:
+        logger.error(f"Unexpected response from {method} {url}: {response_data}")
+        return None
+    return response_data['data']
 
-        async with aiohttp.ClientSession() as session:
-            async with session.request(method, final_url, json=body, headers=headers) as response:
-                response_data = await response.json()
-                if response.status != 200 or 'data' not in response_data:
-                    logger.error(f"Error {response.status} from API: {response_data}")
-                    return None
-                return response_data['data']
+async def handle_message(connection_manager, frame, KEY, SECRET):
+    # No handler-wide transaction: the handlers await the API and fetch_ip, and holding
+    # SQLite's write lock across those would fail every other order's writes. Each
+    # write commits on its own, or with the writes it belongs to in a short unit_of_work.
+    try:
+        async with get_pool(DB_FILE).connection() as conn:
+            await merchant_account.handle_message_by_type(connection_manager, KEY, SECRET, frame, conn)
     except Exception as e:
-        logger.exception(f"An error occurred in send_http_request: {e}")
-        return None
+        # Cached rows and event keys may hold writes that were just rolled back.
+        order_cache.invalidate(frame.order_no)
+        inbound_events.discard(frame.order_no)
+        logger.exception("Database operation failed, rolled back: %s", e)
 
 async def on_message(connection_manager, message, KEY, SECRET):
-    merchant_account = MerchantAccount()
     try:
-        msg_json = json.loads(message)
-        is_self = msg_json.get('self', False)
-        if is_self:
-            logger.debug("message was from self")
+        frame = chat_frame_filter.accept(message)
+        if frame is None:
             return
-        msg_type = msg_json.get('type', '')
-        if msg_type == 'auto_reply':
-            logger.debug("Ignoring auto-reply message")
+        logger.debug(message)
+        await handle_message(connection_manager, frame, KEY, SECRET)
+    except Exception as e:
+        logger.exception("An exception occurred: %s", e)
+
+async def dispatch_message(connection_manager, message, KEY, SECRET):
+    """Hand a frame to the per-order dispatcher so slow orders do not block the socket."""
+    try:
+        frame = chat_frame_filter.accept(message)
+        if frame is None:
             return
-        conn = await create_connection("C:/Users/p7016/Documents/bpa/orders_data.db")
-        if conn:
-            logger.debug(message)
-            try:
-                await merchant_account.handle_message_by_type(connection_manager, KEY, SECRET, msg_json, msg_type, conn)
-                await conn.commit()               
-            except Exception as e:
-                await conn.rollback()
-                logger.exception("Database operation failed, rolled back: %s", e)
-            finally:
-                await conn.close()
-        else:
-            logger.error("Failed to connect to the database.")
+        logger.debug(message)
+        await order_dispatcher.submit(frame.order_no, handle_message, connection_manager, frame, KEY, SECRET)
     except Exception as e:
         logger.exception("An exception occurred: %s", e)
+
 class ConnectionManager:
     def __init__(self, uri, api_key, secret_key):
         self.uri = uri
@@ -75,14 +82,20 @@ class ConnectionManager:
         self.is_connected = False
 
     async def send_text_message(self, text, order_no):
+        """Queue text behind anything already waiting for the order's chat; returns without waiting for the send."""
+        outbound_messages.enqueue(self, order_no, text)
+
+    async def write_text_message(self, text, order_no):
+        """Write text to the socket now. Returns whether it was sent."""
+        timestamp = server_timestamp()
         message = {
             'type': 'text',
-            'uuid': f"self_{await get_server_timestamp()}",
+            'uuid': f"self_{timestamp}",
             'orderNo': order_no,
             'content': text,
             'self': False,
             'clientType': 'web',
-            'createTime': await get_server_timestamp(),
+            'createTime': timestamp,
             'sendStatus': 4
         }
         message_json = json.dumps(message)
@@ -94,61 +107,125 @@ class ConnectionManager:
             try:
                 await self.ws.send(message_json)
                 logger.info(f"Message sent")
+                return True
             except Exception as e:
                 logger.error(f"Message sending failed: {e}.")
         else:
             logger.error("Failed to send message: WebSocket not connected.")
-
-async def run_websocket(KEY, SECRET):
-    uri_path = GET_CHAT_CREDENTIALS
-    backoff = 1
-    max_backoff = 2  # Maximum backoff time set to 
-    retry_count = 0
-    max_retries = 2000  # Maximum of 200 retry attempts
-
-    while retry_count < max_retries:
-        try:
-            response = await send_http_request("GET", uri_path, KEY, SECRET)
-            if 'chatWssUrl' in response:
-                wss_url = f"{response['chatWssUrl']}/{response['listenKey']}?token={response['listenToken']}&clientType=web"
-            else:
-                logger.error(f"Key 'chatWssUrl' not found in API response. Full response: {response}")
-                retry_count += 1
-                await asyncio.sleep(backoff)
-                backoff = min(max_backoff, backoff * 2)
-                continue
-            connection_manager = ConnectionManager(wss_url, KEY, SECRET)
-            logger.debug(f"Attempting to connect to WebSocket with URL: {wss_url}")
-            async with websockets.connect(wss_url) as ws:
-                connection_manager.ws = ws
-                connection_manager.is_connected = True
+        return False
+
+class ChatConnectionSupervisor:
+    """Keeps one account's chat socket connected.
+
+    Chat credentials are refreshed in the background so a reconnect usually
+    skips the HTTP round trip, and keepalive pings close a dead socket within
+    PING_INTERVAL + PING_TIMEOUT. Reconnects back off with jitter and pause for
+    CIRCUIT_OPEN_SECONDS after CIRCUIT_FAILURE_THRESHOLD failures in a row.
+    Order history is reconciled on a timer and straight after every reconnect.
+    """
+
+    def __init__(self, KEY, SECRET, account):
+        self.KEY = KEY
+        self.SECRET = SECRET
+        # Shared across reconnects so work still queued in the dispatcher sends on the new socket.
+        self.connection_manager = ConnectionManager(None, KEY, SECRET)
+        self.reconciler = OrderReconciler(KEY, SECRET, account)
+        self._credentials = None  # (wss_url, monotonic time fetched)
+        self.failures = 0
+        self.connections = 0
+
+    async def _fetch_credentials(self):
+        response = await send_http_request("GET", GET_CHAT_CREDENTIALS, self.KEY, self.SECRET)
+        if not response or 'chatWssUrl' not in response:
+            logger.error(f"Key 'chatWssUrl' not found in API response. Full response: {response}")
+            return None
+        wss_url = f"{response['chatWssUrl']}/{response['listenKey']}?token={response['listenToken']}&clientType=web"
+        self._credentials = (wss_url, time.monotonic())
+        return wss_url
+
+    async def _refresh_credentials(self):
+        while True:
+            await asyncio.sleep(CHAT_CREDENTIALS_REFRESH)
+            try:
+                await self._fetch_credentials()
+            except Exception as e:
+                # Keep refreshing; until one succeeds, reconnects fetch credentials themselves.
+                logger.exception(f"Refreshing chat credentials failed: {e}")
+
+    async def _wss_url(self):
+        if self._credentials is not None:
+            wss_url, fetched_at = self._credentials
+            if time.monotonic() - fetched_at < CHAT_CREDENTIALS_MAX_AGE:
+                return wss_url
+        return await self._fetch_credentials()
+
+    def _backoff(self):
+        return random.uniform(0, min(RECONNECT_MAX_BACKOFF, RECONNECT_BASE_BACKOFF * 2 ** self.failures))
+
+    async def _connect_once(self):
+        wss_url = await self._wss_url()
+        if wss_url is None:
+            raise ConnectionError("No chat credentials")
+        connection_manager = self.connection_manager
+        connection_manager.uri = wss_url
+        logger.debug(f"Attempting to connect to WebSocket with URL: {wss_url}")
+        async with websockets.connect(wss_url, ping_interval=PING_INTERVAL, ping_timeout=PING_TIMEOUT) as ws:
+            connection_manager.ws = ws
+            connection_manager.is_connected = True
+            self.failures = 0
+            self.connections += 1
+            if self.connections > 1:
+                self.reconciler.trigger()
+            try:
                 async for message in ws:
-                    await on_message(connection_manager, message, KEY, SECRET)
-            connection_manager.is_connected = False
-            logger.info("WebSocket connection closed gracefully.")
-            backoff = 1
-            retry_count = 0
-
-        except Exception as e:
-            logger.exception("An unexpected error occurred:")
-            await asyncio.sleep(backoff)
-            backoff = min(max_backoff, backoff * 2)
-            retry_count += 1
+                    await dispatch_message(connection_manager, message, self.KEY, self.SECRET)
+            finally:
+                connection_manager.is_connected = False
 
-    logger.error(f"Reached maximum retry limit of {max_retries}. Exiting.")
+    async def run(self):
+        background_tasks = [asyncio.create_task(self._refresh_credentials()),
+                            asyncio.create_task(self.reconciler.run(self.connection_manager))]
+        try:
+            while True:
+                try:
+                    await self._connect_once()
+                    logger.info(f"WebSocket connection closed gracefully. Dispatcher stats: {order_dispatcher.stats()}, frames: {chat_frame_filter.stats()}, events: {inbound_events.stats()}, outbound messages: {outbound_messages.stats()}")
+                except Exception:
+                    self.failures += 1
+                    # The listenKey may be what failed; fetch a new one next time.
+                    self._credentials = None
+                    logger.exception(f"Chat connection failed ({self.failures} in a row):")
+                if self.failures >= CIRCUIT_FAILURE_THRESHOLD:
+                    logger.error(f"{self.failures} chat connection failures in a row, pausing reconnects for {CIRCUIT_OPEN_SECONDS}s")
+                    await asyncio.sleep(CIRCUIT_OPEN_SECONDS)
+                    # Half-open: one more failure opens the breaker again.
+                    self.failures = CIRCUIT_FAILURE_THRESHOLD - 1
+                else:
+                    await asyncio.sleep(self._backoff())
+        finally:
+            for task in background_tasks:
+                task.cancel()
+
+async def run_websocket(KEY, SECRET, account):
+    await ChatConnectionSupervisor(KEY, SECRET, account).run()
 
 async def on_close(connection_manager, close_status_code, close_msg, KEY, SECRET):
     logger.debug(f"### closed ###")
 
 async def main_binance_c2c():
-    credentials = list(credentials_dict.values())
+    await ServerTimestampCache.start()
+    await migrate_database(DB_FILE, ORDERS_DB_MIGRATIONS)
+    async with get_pool(DB_FILE).connection() as conn:
+        await inbound_events.warm(conn)
     tasks = []
-    for cred in credentials:
+    for account, cred in credentials_dict.items():
         task = asyncio.create_task(
-            run_websocket(cred['KEY'], cred['SECRET'])
+            run_websocket(cred['KEY'], cred['SECRET'], account)
         )
         tasks.append(task)
     try:
         await asyncio.gather(*tasks)
     except KeyboardInterrupt:
-        logger.debug("KeyboardInterrupt received. Exiting.")
\ No newline at end of file
+        logger.debug("KeyboardInterrupt received. Exiting.")
+    finally:
+        await close_pools()
\ No newline at end of file
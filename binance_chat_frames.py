@@ -0,0 +1,84 @@
+import logging
+from collections import Counter
+from dataclasses import dataclass
+from binance_order_cache import order_cache
+
+try:
+    import orjson
+    loads = orjson.loads
+except ImportError:
+    import json
+    loads = json.loads
+
+logger = logging.getLogger(__name__)
+
+# Orders the bot never answers in chat.
+IGNORED_SELLER_NAMES = frozenset({'LOPEZ GUERRERO FRANCISCO JAVIER'})
+IGNORED_FIAT_UNITS = frozenset({'USD'})
+
+@dataclass(slots=True)
+class ChatFrame:
+    """The fields of a chat websocket frame the handlers use."""
+    type: str
+    order_no: str
+    uuid: str
+    status: str
+    content: str
+    is_self: bool
+
+    @classmethod
+    def from_json(cls, msg_json):
+        return cls(msg_json.get('type') or '', msg_json.get('orderNo') or '', msg_json.get('uuid') or '',
+                   msg_json.get('status'), msg_json.get('content') or '', bool(msg_json.get('self', False)))
+
+class ChatFrameFilter:
+    """Decodes chat frames and drops the ones no handler would act on, before any DB work.
+
+    Orders are only checked against the ignore lists when their row is already
+    in order_cache; anything else is left to the handlers to decide.
+    """
+
+    def __init__(self):
+        self.passed = 0
+        self.dropped = Counter()
+
+    def classify(self, message):
+        """Return (ChatFrame, None) for frames to handle, or (None, reason) for ones to drop."""
+        try:
+            msg_json = loads(message)
+        except ValueError:
+            return None, 'malformed'
+        if not isinstance(msg_json, dict):
+            return None, 'malformed'
+        frame = ChatFrame.from_json(msg_json)
+        if frame.is_self:
+            return None, 'self'
+        if frame.type == 'auto_reply':
+            return None, 'auto_reply'
+        if frame.type != 'system':
+            if frame.status == 'read':
+                return None, 'read_receipt'
+            if frame.uuid.startswith('self_'):
+                return None, 'self_uuid'
+            order = order_cache.peek(frame.order_no)
+            if order is not None:
+                if order.fiat_unit in IGNORED_FIAT_UNITS:
+                    return None, 'ignored_fiat'
+                if order.seller_name in IGNORED_SELLER_NAMES:
+                    return None, 'ignored_seller'
+        return frame, None
+
+    def accept(self, message):
+        """Return the ChatFrame to handle, or None after counting why it was dropped."""
+        frame, reason = self.classify(message)
+        if frame is None:
+            self.dropped[reason] += 1
+            logger.debug(f"Dropped chat frame: {reason}")
+            return None
+        self.passed += 1
+        return frame
+
+    def stats(self):
+        return {'passed': self.passed, 'dropped': dict(self.dropped)}
+
+chat_frame_filter = ChatFrameFilter()
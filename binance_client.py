@@ -0,0 +1,129 @@
+import asyncio
+import random
+import time
+import logging
+from urllib.parse import urlencode
+from common_utils import server_timestamp, hashing
+from common_utils_http import get_http_session
+
+logger = logging.getLogger(__name__)
+
+WEIGHT_LIMIT_PER_MINUTE = 1200
+# The header reporting weight against WEIGHT_LIMIT_PER_MINUTE. SAPI endpoints also send
+# x-sapi-used-*-weight-1m headers, counted against separate, larger IP and UID limits.
+USED_WEIGHT_HEADER = 'x-mbx-used-weight-1m'
+MAX_RETRIES = 3
+BASE_BACKOFF = 0.5  # seconds
+MAX_BACKOFF = 8  # seconds
+RETRYABLE_STATUSES = {418, 429, 500, 502, 503, 504}
+
+class TokenBucket:
+    """Request-weight budget refilled continuously up to a per-minute limit."""
+
+    def __init__(self, capacity=WEIGHT_LIMIT_PER_MINUTE, refill_per_second=WEIGHT_LIMIT_PER_MINUTE / 60):
+        self.capacity = capacity
+        self.refill_per_second = refill_per_second
+        self.tokens = float(capacity)
+        self.updated_at = time.monotonic()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.refill_per_second)
+        self.updated_at = now
+
+    async def acquire(self, weight=1):
+        async with self._lock:
+            self._refill()
+            while self.tokens < weight:
+                await asyncio.sleep((weight - self.tokens) / self.refill_per_second)
+                self._refill()
+            self.tokens -= weight
+
+    def try_acquire(self, weight=1):
+        """Take weight only if it is available right now."""
+        self._refill()
+        if self.tokens < weight:
+            return False
+        self.tokens -= weight
+        return True
+
+    def sync_used_weight(self, used_weight):
+        """Never assume more headroom than the server reports for the current minute."""
+        self._refill()
+        self.tokens = min(self.tokens, self.capacity - used_weight)
+
+class BinanceClient:
+    """Signs, rate limits and retries requests for one API key."""
+
+    banned_until = 0.0  # shared: 418/429 bans apply to the whole IP
+
+    def __init__(self, KEY, SECRET, weight_limit=WEIGHT_LIMIT_PER_MINUTE):
+        self.KEY = KEY
+        self.SECRET = SECRET
+        self.bucket = TokenBucket(weight_limit, weight_limit / 60)
+        self.used_weight = 0
+
+    def signed_query(self, params):
+        query_string = urlencode(params)
+        return f"{query_string}&signature={hashing(query_string, self.SECRET)}"
+
+    def headers(self):
+        return {
+            "Content-Type": "application/json;charset=utf-8",
+            "X-MBX-APIKEY": self.KEY,
+            "clientType": "WEB",
+        }
+
+    def _record_used_weight(self, response):
+        used = response.headers.get(USED_WEIGHT_HEADER)
+        if used is not None and used.isdigit():
+            self.used_weight = int(used)
+            self.bucket.sync_used_weight(self.used_weight)
+
+    def _backoff(self, attempt, response=None):
+        retry_after = response.headers.get('Retry-After') if response is not None else None
+        if retry_after and retry_after.isdigit():
+            return float(retry_after)
+        return random.uniform(0, min(MAX_BACKOFF, BASE_BACKOFF * 2 ** attempt))
+
+    async def request(self, method, url, params=None, body=None, weight=1, max_retries=MAX_RETRIES):
+        """Send a signed request and return the decoded JSON, or None on failure."""
+        for attempt in range(max_retries):
+            wait = BinanceClient.banned_until - time.monotonic()
+            if wait > 0:
+                logger.warning(f"Rate limited by Binance, waiting {wait:.1f}s before {method} {url}")
+                await asyncio.sleep(wait)
+            await self.bucket.acquire(weight)
+            query = dict(params or {})
+            query['timestamp'] = server_timestamp()
+            delay = self._backoff(attempt)
+            try:
+                session = get_http_session()
+                async with session.request(method, f"{url}?{self.signed_query(query)}", json=body, headers=self.headers()) as response:
+                    self._record_used_weight(response)
+                    if response.status == 200:
+                        return await response.json(content_type=None)
+                    error_text = await response.text()
+                    if response.status not in RETRYABLE_STATUSES:
+                        logger.error(f"{method} {url} failed with status {response.status}: {error_text}")
+                        return None
+                    delay = self._backoff(attempt, response)
+                    if response.status in (418, 429):
+                        BinanceClient.banned_until = max(BinanceClient.banned_until, time.monotonic() + delay)
+                    logger.warning(f"{method} {url} returned {response.status} (used weight {self.used_weight}): {error_text}")
+            except Exception as e:
+                logger.error(f"{method} {url} failed on attempt {attempt + 1}/{max_retries}: {e}")
+            if attempt < max_retries - 1:
+                await asyncio.sleep(delay)
+        logger.error(f"{method} {url} failed after {max_retries} attempts")
+        return None
+
+_clients = {}
+
+def get_client(KEY, SECRET):
+    """One client per API key so every loop using that key shares its weight budget."""
+    client = _clients.get(KEY)
+    if client is None or client.SECRET != SECRET:
+        client = _clients[KEY] = BinanceClient(KEY, SECRET)
+    return client
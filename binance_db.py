@@ -1,7 +1,8 @@
 
 import asyncio
 from common_vars import DB_FILE
-from common_utils_db import create_connection, execute_and_commit, print_table_contents, create_table
+from common_utils_db import create_connection, print_table_contents
+from binance_order_cache import order_cache
 import logging
 logger = logging.getLogger(__name__)
 
@@ -35,6 +36,21 @@ async def insert_order(conn, order_tuple):
                                 VALUES(?,?,?,?,?,?,?,?,?)''', order_tuple)
         logger.debug(f"Inserted new order: {order_tuple[0]}")
         return cursor.lastrowid
+
+SQL_UPSERT_ORDER = """
+    INSERT INTO orders (order_no, buyer_name, seller_name, trade_type, order_status, total_price, fiat_unit, asset, amount)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(order_no) DO UPDATE SET
+        order_status = excluded.order_status, seller_name = excluded.seller_name, buyer_name = excluded.buyer_name,
+        trade_type = excluded.trade_type, total_price = excluded.total_price, fiat_unit = excluded.fiat_unit,
+        asset = excluded.asset, amount = excluded.amount
+"""
+
+SQL_INSERT_ORDER_BANK_IDENTIFIER = """
+    INSERT INTO order_bank_identifiers (order_no, bank_identifier) VALUES (?, ?)
+    ON CONFLICT(order_no, bank_identifier) DO NOTHING
+"""
+
 async def insert_or_update_order(conn, order_details):
     try:
         logger.debug("Order Details Received in db:")
@@ -52,55 +68,28 @@ async def insert_or_update_order(conn, order_details):
         if None in (seller_name, buyer_name, order_no, trade_type, order_status, total_price, fiat_unit):
             logger.error("One or more required fields are None. Aborting operation.")
             return
+        order_cache.invalidate(order_no)
 
-        # Check if order exists and update or insert accordingly
-        if await order_exists(conn, order_no):
-            logger.debug("Updating existing order...")
-            # Here we update all provided fields, ensuring that any changes are applied
-            sql = """
-                UPDATE orders
-                SET order_status = ?, seller_name = ?, buyer_name = ?, trade_type = ?, total_price = ?, fiat_unit = ?, asset = ?, amount = ?
-                WHERE order_no = ?
-            """
-            params = (order_status, seller_name, buyer_name, trade_type, total_price, fiat_unit, asset, amount, order_no)
-            await execute_and_commit(conn, sql, params)
-        else:
-            logger.debug("Inserting new order...")
-            # Before inserting a new order, ensure the buyer exists or is inserted into the database
-            await find_or_insert_buyer(conn, buyer_name)
-            # Now insert the new order
-            sql = """
-                INSERT INTO orders (order_no, buyer_name, seller_name, trade_type, order_status, total_price, fiat_unit, asset, amount)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """
-            params = (order_no, buyer_name, seller_name, trade_type, order_status, total_price, fiat_unit, asset, amount)
-            await execute_and_commit(conn, sql, params)
-
-        # Extract and insert bank identifiers for the order
-        pay_methods = data.get('payMethods', [])
-        for method in pay_methods:
-            bank_identifier = method.get('identifier')
-            # Ensure there's an identifier to insert
-            if bank_identifier:  
-                sql = """
-                    INSERT INTO order_bank_identifiers (order_no, bank_identifier)
-                    VALUES (?, ?)
-                """
-                params = (order_no, bank_identifier)
-                await execute_and_commit(conn, sql, params)
+        # Writes only; the caller's transaction commits them together.
+        await find_or_insert_buyer(conn, buyer_name)
+        await conn.execute(SQL_UPSERT_ORDER, (order_no, buyer_name, seller_name, trade_type, order_status, total_price, fiat_unit, asset, amount))
+        bank_identifiers = [identifier for identifier in dict.fromkeys(method.get('identifier') for method in data.get('payMethods', [])) if identifier]
+        if bank_identifiers:
+            await conn.executemany(SQL_INSERT_ORDER_BANK_IDENTIFIER, ((order_no, identifier) for identifier in bank_identifiers))
+        logger.debug(f"Upserted order {order_no} with {len(bank_identifiers)} bank identifiers")
 
     except Exception as e:
         logger.error(f"Error in insert_or_update_order: {e}")
         print(f"Exception details: {e}")
 
 async def remove(conn, order_no):
+    order_cache.invalidate(order_no)
     await conn.execute("DELETE FROM orders WHERE order_no = ?", (order_no,))
     await conn.commit()
 async def remove_user(conn, name):
     await conn.execute("DELETE FROM users WHERE name = ?", (name,))
     await conn.commit()
-async def main():  
-    sql_create_merchants_table = """CREATE TABLE IF NOT EXISTS merchants (
+SQL_CREATE_MERCHANTS_TABLE = """CREATE TABLE IF NOT EXISTS merchants (
                                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                                 sellerName TEXT NOT NULL UNIQUE,
                                 api_key TEXT,  -- Encrypted API key
@@ -109,7 +98,8 @@ async def main():
                                 password_hash TEXT,
                                 phone_num TEXT
                                 );"""
-    sql_create_users_table = """CREATE TABLE IF NOT EXISTS users (
+
+SQL_CREATE_USERS_TABLE = """CREATE TABLE IF NOT EXISTS users (
                             id INTEGER PRIMARY KEY AUTOINCREMENT,
                             name TEXT NOT NULL UNIQUE,
                             kyc_status INTEGER DEFAULT 0,
@@ -119,7 +109,7 @@ async def main():
                             codigo_postal TEXT NULL  -- Codigo Postal can be NULL
                             );"""
 
-    sql_create_transactions_table = """CREATE TABLE IF NOT EXISTS transactions (
+SQL_CREATE_TRANSACTIONS_TABLE = """CREATE TABLE IF NOT EXISTS transactions (
                                     id INTEGER PRIMARY KEY AUTOINCREMENT,
                                     buyer_name TEXT,
                                     seller_name TEXT,
@@ -127,7 +117,8 @@ async def main():
                                     order_date TIMESTAMP,
                                     merchant_id INTEGER REFERENCES merchants(id) 
                                     );"""
-    sql_create_orders_table = """CREATE TABLE IF NOT EXISTS orders (
+
+SQL_CREATE_ORDERS_TABLE = """CREATE TABLE IF NOT EXISTS orders (
                             id INTEGER PRIMARY KEY AUTOINCREMENT,
                             order_no TEXT NOT NULL UNIQUE,
                             buyer_name TEXT,
@@ -145,22 +136,31 @@ async def main():
                             seller_bank_account TEXT,
                             merchant_id INTEGER REFERENCES merchants(id)  
                             );"""
-    sql_create_order_bank_identifiers_table = """CREATE TABLE IF NOT EXISTS order_bank_identifiers (
+
+SQL_CREATE_ORDER_BANK_IDENTIFIERS_TABLE = """CREATE TABLE IF NOT EXISTS order_bank_identifiers (
                             id INTEGER PRIMARY KEY AUTOINCREMENT,
                             order_no TEXT NOT NULL,
                             bank_identifier TEXT NOT NULL,
                             FOREIGN KEY (order_no) REFERENCES orders(order_no)
                             );"""
 
+# Where each account's order history reconciliation got to, in server time ms.
+SQL_CREATE_RECONCILE_CURSORS_TABLE = """CREATE TABLE IF NOT EXISTS reconcile_cursors (
+                            account TEXT PRIMARY KEY,
+                            last_seen INTEGER NOT NULL
+                            );"""
 
+# Inbound events already handled, so redelivered frames and replays are applied once.
+SQL_CREATE_INBOUND_EVENTS_TABLE = """CREATE TABLE IF NOT EXISTS inbound_events (
+                            order_no TEXT NOT NULL,
+                            event_key TEXT NOT NULL,  -- 'uuid:<frame uuid>' or 'status:<order_status>'
+                            received_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+                            PRIMARY KEY (order_no, event_key)
+                            ) WITHOUT ROWID;"""
+
+async def main():  
     conn = await create_connection(DB_FILE)
     if conn is not None:
-        # await create_table(conn, sql_create_merchants_table)
-        # await create_table(conn, sql_create_users_table)
-        # await create_table(conn, sql_create_transactions_table)
-        # await create_table(conn, sql_create_orders_table)
-        # await create_table(conn, sql_create_order_bank_identifiers_table)
-
         # Print table contents for verification
         # await remove(conn, '20598203477247664128')
         # await remove_user(conn, 'MARTINEZ MARTINEZ JUAN MANUEL')
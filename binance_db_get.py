@@ -1,24 +1,45 @@
 import aiosqlite
 from common_vars import DB_FILE
+from binance_order_cache import order_cache
+from binance_models import Order, ORDER_COLUMNS
 import logging
 logger = logging.getLogger(__name__)
 
+SQL_SELECT_ORDER = f"SELECT {', '.join(ORDER_COLUMNS)} FROM orders WHERE order_no=?"
+
+def order_row_factory(cursor, row):
+    """Row factory for queries selecting ORDER_COLUMNS."""
+    return Order(*row)
 
-    
 async def get_order_details(conn, order_no):
     try:
         async with conn.cursor() as cursor:
-            await cursor.execute("SELECT * FROM orders WHERE order_no=?", (order_no,))
-            row = await cursor.fetchone()
-            if row:
-                column_names = [desc[0] for desc in cursor.description]
-                return {column_names[i]: row[i] for i in range(len(row))}
-            else:
-                return None
+            cursor.row_factory = order_row_factory
+            await cursor.execute(SQL_SELECT_ORDER, (order_no,))
+            return await cursor.fetchone()
     except Exception as e:
         logger.error(f"An error occurred: {e}")
         return None
 
+async def get_order_statuses(conn, order_nos):
+    """{order_no: order_status} for the given orders that are in the table."""
+    if not order_nos:
+        return {}
+    sql = f"SELECT order_no, order_status FROM orders WHERE order_no IN ({','.join('?' * len(order_nos))})"
+    async with conn.execute(sql, tuple(order_nos)) as cursor:
+        return dict(await cursor.fetchall())
+
+async def get_reconcile_cursor(conn, account):
+    async with conn.execute("SELECT last_seen FROM reconcile_cursors WHERE account = ?", (account,)) as cursor:
+        row = await cursor.fetchone()
+        return row[0] if row else None
+
+async def get_cached_order_details(conn, order_no):
+    order_details = order_cache.get(order_no)
+    if order_details is None:
+        order_details = await get_order_details(conn, order_no)
+        order_cache.put(order_no, order_details)
+    return order_details
     
 async def fetch_merchant_credentials(merchant_id):
     async with aiosqlite.connect(DB_FILE) as conn:  # Use your actual database connection here
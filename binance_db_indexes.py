@@ -0,0 +1,20 @@
+# Indexes for the hot lookups on orders_data.db. orders.order_no, users.name and
+# P2PBlacklist.name are already served by their UNIQUE constraints.
+ORDERS_DB_INDEXES = [
+    # has_specific_bank_identifiers
+    "CREATE INDEX IF NOT EXISTS idx_order_bank_identifiers_order_no ON order_bank_identifiers (order_no, bank_identifier)",
+    # calculate_crypto_sold_30d
+    "CREATE INDEX IF NOT EXISTS idx_orders_buyer_status_date ON orders (buyer_name, order_status, order_date, amount)",
+    # check_deposit_limit
+    "CREATE INDEX IF NOT EXISTS idx_mxn_deposits_account_from_period ON mxn_deposits (account_number, deposit_from, year, month, amount_deposited)",
+    # find_suitable_account: daily and monthly totals
+    "CREATE INDEX IF NOT EXISTS idx_mxn_deposits_timestamp ON mxn_deposits (timestamp, account_number, amount_deposited)",
+    # find_suitable_account: last account used by the buyer
+    "CREATE INDEX IF NOT EXISTS idx_mxn_deposits_from_timestamp ON mxn_deposits (deposit_from, timestamp, account_number)",
+    # sum_recent_deposits
+    "CREATE INDEX IF NOT EXISTS idx_mxn_deposits_account_timestamp ON mxn_deposits (account_number, timestamp, amount_deposited)",
+]
+
+# One row per (order_no, bank_identifier); the upsert in insert_or_update_order relies on it.
+# Replaces idx_order_bank_identifiers_order_no, which has the same columns.
+ORDER_BANK_IDENTIFIERS_UNIQUE_INDEX = "CREATE UNIQUE INDEX IF NOT EXISTS uq_order_bank_identifiers ON order_bank_identifiers (order_no, bank_identifier)"
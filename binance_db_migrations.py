@@ -0,0 +1,138 @@
+import asyncio
+import logging
+from common_vars import DB_FILE
+from common_utils_db import create_connection, add_column_if_not_exists
+from binance_db import SQL_CREATE_MERCHANTS_TABLE, SQL_CREATE_USERS_TABLE, SQL_CREATE_TRANSACTIONS_TABLE, SQL_CREATE_ORDERS_TABLE, SQL_CREATE_ORDER_BANK_IDENTIFIERS_TABLE, SQL_CREATE_RECONCILE_CURSORS_TABLE, SQL_CREATE_INBOUND_EVENTS_TABLE
+from binance_bank_deposit_db import SQL_CREATE_MXN_DEPOSITS_TABLE, SQL_CREATE_MXN_BANK_ACCOUNTS_TABLE
+from binance_blacklist import SQL_CREATE_P2P_BLACKLIST_TABLE
+from binance_db_indexes import ORDERS_DB_INDEXES, ORDER_BANK_IDENTIFIERS_UNIQUE_INDEX
+from ads_database import DB_PATH as ADS_DB_PATH, SQL_CREATE_ADS_TABLE
+
+logger = logging.getLogger(__name__)
+
+# Columns that were added to the tables after the first databases were created.
+# (table, column, type, default)
+LATE_COLUMNS = [
+    ('users', 'anti_fraud_stage', 'INTEGER', 0),
+    ('users', 'rfc', 'TEXT', 'NULL'),
+    ('users', 'codigo_postal', 'TEXT', 'NULL'),
+    ('orders', 'account_number', 'TEXT', 'NULL'),
+    ('orders', 'menu_presented', 'BOOLEAN', 'FALSE'),
+    ('orders', 'buyer_bank', 'TEXT', 'NULL'),
+    ('orders', 'seller_bank_account', 'TEXT', 'NULL'),
+    ('orders', 'merchant_id', 'INTEGER REFERENCES merchants(id)', 'NULL'),
+    ('transactions', 'merchant_id', 'INTEGER REFERENCES merchants(id)', 'NULL'),
+    ('mxn_deposits', 'deposit_from', 'TEXT', 'NULL'),
+    ('mxn_deposits', 'year', 'INTEGER', 'NULL'),
+    ('mxn_deposits', 'month', 'INTEGER', 'NULL'),
+    ('mxn_deposits', 'merchant_id', 'INTEGER REFERENCES merchants(id)', 'NULL'),
+    ('mxn_bank_accounts', 'account_balance', 'REAL', 0),
+    ('mxn_bank_accounts', 'last_used_timestamp', 'DATETIME', 'NULL'),
+    ('mxn_bank_accounts', 'merchant_id', 'INTEGER REFERENCES merchants(id)', 'NULL'),
+    ('P2PBlacklist', 'response', 'TEXT', 'NULL'),
+    ('P2PBlacklist', 'anti_fraud_stage', 'INTEGER', 0),
+]
+
+async def add_late_columns(conn):
+    for table_name, column_name, data_type, default_value in LATE_COLUMNS:
+        await add_column_if_not_exists(conn, table_name, column_name, data_type, default_value)
+
+# Each entry is one schema version; PRAGMA user_version holds the last one applied.
+# Steps are SQL strings or async callables taking the connection. Never edit an
+# entry that has shipped, append a new one instead.
+ORDERS_DB_MIGRATIONS = [
+    # 1: baseline, matches databases created before migrations existed
+    [
+        SQL_CREATE_MERCHANTS_TABLE,
+        SQL_CREATE_USERS_TABLE,
+        SQL_CREATE_TRANSACTIONS_TABLE,
+        SQL_CREATE_ORDERS_TABLE,
+        SQL_CREATE_ORDER_BANK_IDENTIFIERS_TABLE,
+        SQL_CREATE_MXN_DEPOSITS_TABLE,
+        SQL_CREATE_MXN_BANK_ACCOUNTS_TABLE,
+        SQL_CREATE_P2P_BLACKLIST_TABLE,
+        add_late_columns,
+    ],
+    # 2: indexes for the hot lookups
+    ORDERS_DB_INDEXES,
+    # 3: drop duplicate bank identifiers left by repeated order refreshes and make them unique
+    [
+        """DELETE FROM order_bank_identifiers WHERE id NOT IN (
+               SELECT MIN(id) FROM order_bank_identifiers GROUP BY order_no, bank_identifier)""",
+        ORDER_BANK_IDENTIFIERS_UNIQUE_INDEX,
+        "DROP INDEX IF EXISTS idx_order_bank_identifiers_order_no",
+    ],
+    # 4: order history reconciliation cursors
+    [SQL_CREATE_RECONCILE_CURSORS_TABLE],
+    # 5: inbound event log for deduplicating chat frames and status replays
+    [SQL_CREATE_INBOUND_EVENTS_TABLE],
+]
+
+ADS_DB_MIGRATIONS = [
+    # 1: baseline
+    [SQL_CREATE_ADS_TABLE],
+]
+
+async def get_schema_version(conn):
+    async with conn.execute("PRAGMA user_version") as cursor:
+        return (await cursor.fetchone())[0]
+
+async def run_migrations(conn, migrations):
+    """Apply every pending version and return the resulting version.
+
+    An up-to-date database is detected without taking the write lock. Each
+    version runs in its own write transaction and commits together with its
+    user_version, so a failure keeps the versions before it and the write
+    lock is only held for one version at a time. Under WAL readers keep
+    working throughout; writers wait on busy_timeout and still fail if a
+    version takes longer, e.g. an index build over a large table.
+    """
+    target = len(migrations)
+    current = await get_schema_version(conn)
+    if current >= target:
+        return current
+    while current < target:
+        await conn.execute("BEGIN IMMEDIATE")
+        try:
+            # Re-read under the lock in case another process migrated in the meantime.
+            current = await get_schema_version(conn)
+            if current >= target:
+                await conn.rollback()
+                break
+            version = current + 1
+            for step in migrations[version - 1]:
+                if callable(step):
+                    await step(conn)
+                else:
+                    await conn.execute(step)
+            await conn.execute(f"PRAGMA user_version = {version}")
+            await conn.commit()
+        except Exception:
+            await conn.rollback()
+            logger.exception(f"Schema migration failed, database left at version {current}")
+            raise
+        logger.info(f"Applied schema version {version}")
+        current = version
+    # Bounded ANALYZE so new indexes get statistics without scanning large tables.
+    await conn.execute("PRAGMA analysis_limit=400")
+    await conn.execute("PRAGMA optimize")
+    return current
+
+async def migrate_database(db_file, migrations):
+    conn = await create_connection(db_file)
+    if conn is None:
+        raise ConnectionError(f"Could not open {db_file} to migrate it")
+    try:
+        await conn.execute("PRAGMA journal_mode=WAL")
+        await conn.execute("PRAGMA busy_timeout=5000")
+        return await run_migrations(conn, migrations)
+    finally:
+        await conn.close()
+
+async def main():
+    for db_file, migrations in ((DB_FILE, ORDERS_DB_MIGRATIONS), (ADS_DB_PATH, ADS_DB_MIGRATIONS)):
+        version = await migrate_database(db_file, migrations)
+        logger.info(f"{db_file} is at schema version {version}")
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -1,4 +1,5 @@
-from common_utils_db import execute_and_commit, handle_error
+from common_utils_db import execute_and_commit, commit_if_needed, handle_error
+from binance_order_cache import order_cache
 import logging
 logger = logging.getLogger(__name__)
 
@@ -12,9 +13,9 @@ async def update_order_details(conn, order_no, account_number):
 
     # Execute the SQL statement with the provided account number and order number
     await conn.execute(sql, (account_number, order_no))
+    order_cache.update(order_no, account_number=account_number)
 
-    # Commit the changes to the database
-    await conn.commit()
+    await commit_if_needed(conn)
 
 async def update_buyer_bank(conn, order_no, new_buyer_bank):
     """
@@ -33,6 +34,7 @@ async def update_buyer_bank(conn, order_no, new_buyer_bank):
 
     try:
         await execute_and_commit(conn, update_query, params)
+        order_cache.update(order_no, buyer_bank=new_buyer_bank)
         logger.debug(f"Updated buyer_bank for order_no {order_no} to {new_buyer_bank}")
     except Exception as e:
         handle_error(e, f"Failed to update buyer_bank for order_no {order_no}")
@@ -41,6 +43,12 @@ async def update_order_status(conn, order_no, order_status):
     sql = "UPDATE orders SET order_status = ? WHERE order_no = ?"
     params = (order_status, order_no)
     await execute_and_commit(conn, sql, params)
+    order_cache.update(order_no, order_status=order_status)
+
+async def set_reconcile_cursor(conn, account, last_seen):
+    sql = """INSERT INTO reconcile_cursors (account, last_seen) VALUES (?, ?)
+             ON CONFLICT(account) DO UPDATE SET last_seen = excluded.last_seen"""
+    await execute_and_commit(conn, sql, (account, last_seen))
 
 async def register_merchant(conn, sellerName):
     if not sellerName: 
@@ -108,7 +116,7 @@ async def update_kyc_status(conn, name, new_kyc_status):
 async def update_anti_fraud_stage(conn, buyer_name, new_stage):
     async with conn.cursor() as cursor:
         await cursor.execute("UPDATE users SET anti_fraud_stage = ? WHERE name = ?", (new_stage, buyer_name))
-        await conn.commit()
+    await commit_if_needed(conn)
 
 async def set_menu_presented(conn, order_no, value):
     """
@@ -126,6 +134,7 @@ async def set_menu_presented(conn, order_no, value):
         sql = "UPDATE orders SET menu_presented = ? WHERE order_no = ?"
         params = (1 if value else 0, order_no)  # Convert to SQLite's BOOLEAN representation
         await execute_and_commit(conn, sql, params)
+        order_cache.update(order_no, menu_presented=params[0])
     except Exception as e:
         logger.error(f"Error setting menu_presented for order_no {order_no}: {e}")
 
@@ -146,6 +155,7 @@ async def update_buyer_bank(conn, order_no, new_buyer_bank):
 
     try:
         await execute_and_commit(conn, update_query, params)
+        order_cache.update(order_no, buyer_bank=new_buyer_bank)
         logger.debug(f"Updated buyer_bank for order_no {order_no} to {new_buyer_bank}")
     except Exception as e:
         handle_error(e, f"Failed to update buyer_bank for order_no {order_no}")
@@ -160,7 +170,7 @@ async def update_order_details(conn, order_no, account_number):
 
     # Execute the SQL statement with the provided account number and order number
     await conn.execute(sql, (account_number, order_no))
+    order_cache.update(order_no, account_number=account_number)
 
-    # Commit the changes to the database
-    await conn.commit()
+    await commit_if_needed(conn)
 
@@ -0,0 +1,73 @@
+import asyncio
+import logging
+from common_utils_db import DB_POOL_SIZE
+
+logger = logging.getLogger(__name__)
+
+MAX_CONCURRENT_ORDERS = DB_POOL_SIZE - 2  # leave connections for the reconciler beside the handlers
+MAX_PENDING_PER_ORDER = 50
+QUEUE_DEPTH_WARNING = 10
+
+class OrderDispatcher:
+    """Runs work for each orderNo in arrival order while different orders run in parallel."""
+
+    def __init__(self, max_concurrency=MAX_CONCURRENT_ORDERS, max_pending_per_order=MAX_PENDING_PER_ORDER):
+        self.max_pending_per_order = max_pending_per_order
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._queues = {}
+        self._workers = {}
+        self.processed = 0
+        self.failed = 0
+        self.max_depth_seen = 0
+
+    async def submit(self, order_no, handler, *args):
+        """Queue handler(*args) behind any pending work for the same order.
+
+        Blocks only when that order's queue is full, which pushes back on the socket reader.
+        """
+        queue = self._queues.get(order_no)
+        if queue is None:
+            queue = self._queues[order_no] = asyncio.Queue(self.max_pending_per_order)
+        await queue.put((handler, args))
+        depth = queue.qsize()
+        self.max_depth_seen = max(self.max_depth_seen, depth)
+        if depth >= QUEUE_DEPTH_WARNING:
+            logger.warning(f"Order {order_no} has {depth} frames queued")
+        if order_no not in self._workers:
+            self._workers[order_no] = asyncio.create_task(self._worker(order_no, queue))
+
+    async def _worker(self, order_no, queue):
+        try:
+            while not queue.empty():
+                handler, args = queue.get_nowait()
+                async with self._semaphore:
+                    try:
+                        await handler(*args)
+                        self.processed += 1
+                    except Exception as e:
+                        self.failed += 1
+                        logger.exception(f"Handler failed for order {order_no}: {e}")
+                queue.task_done()
+        finally:
+            self._workers.pop(order_no, None)
+            if queue.empty():
+                self._queues.pop(order_no, None)
+
+    def queue_depths(self):
+        return {order_no: queue.qsize() for order_no, queue in self._queues.items() if queue.qsize()}
+
+    def stats(self):
+        depths = self.queue_depths()
+        return {
+            'active_orders': len(self._workers),
+            'queued': sum(depths.values()),
+            'max_depth_seen': self.max_depth_seen,
+            'processed': self.processed,
+            'failed': self.failed,
+        }
+
+    async def join(self):
+        while self._workers:
+            await asyncio.gather(*list(self._workers.values()), return_exceptions=True)
+
+order_dispatcher = OrderDispatcher()
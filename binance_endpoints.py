@@ -15,5 +15,17 @@ USER_DATA_STREAM_ENDPOINT = f"{BASE_ENDPOINT}/api/v3/userDataStream"
 # Retrieve User Order Detail
 USER_ORDER_DETAIL = f"{BASE_ENDPOINT}/sapi/v1/c2c/orderMatch/getUserOrderDetail"
 
+# Order history, newest first (paged)
+ORDER_HISTORY = f"{BASE_ENDPOINT}/sapi/v1/c2c/orderMatch/listUserOrderHistory"
+
 # Search Ads
 SEARCH_ADS = f"{BASE_ENDPOINT}/sapi/v1/c2c/ads/search"
+
+# Ad detail and update
+AD_DETAIL = f"{BASE_ENDPOINT}/sapi/v1/c2c/ads/getDetailByNo"
+AD_UPDATE = f"{BASE_ENDPOINT}/sapi/v1/c2c/ads/update"
+
+# Wallet balances and spot orders
+USER_ASSET = f"{BASE_ENDPOINT}/sapi/v3/asset/getUserAsset"
+FUNDING_ASSET = f"{BASE_ENDPOINT}/sapi/v1/asset/get-funding-asset"
+SPOT_ORDER = f"{BASE_ENDPOINT}/api/v3/order"
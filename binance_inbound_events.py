@@ -0,0 +1,132 @@
+import hashlib
+import logging
+import math
+from collections import OrderedDict
+from common_utils_db import commit_if_needed
+
+logger = logging.getLogger(__name__)
+
+INBOUND_EVENT_CACHE_SIZE = 4096
+INBOUND_EVENT_FILTER_CAPACITY = 1_000_000  # events the filter holds at INBOUND_EVENT_FILTER_ERROR_RATE
+INBOUND_EVENT_FILTER_ERROR_RATE = 0.01
+
+SQL_SELECT_INBOUND_EVENT = "SELECT 1 FROM inbound_events WHERE order_no = ? AND event_key = ?"
+SQL_SELECT_ALL_INBOUND_EVENTS = "SELECT order_no, event_key FROM inbound_events"
+SQL_INSERT_INBOUND_EVENT = "INSERT INTO inbound_events (order_no, event_key) VALUES (?, ?) ON CONFLICT DO NOTHING"
+
+def frame_event_key(uuid):
+    return f"uuid:{uuid}"
+
+def status_event_key(order_status):
+    return f"status:{order_status}"
+
+class BloomFilter:
+    """Set membership that may answer yes wrongly but never answers no wrongly."""
+
+    def __init__(self, capacity=INBOUND_EVENT_FILTER_CAPACITY, error_rate=INBOUND_EVENT_FILTER_ERROR_RATE):
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item):
+        # Double hashing: two 64-bit halves of one digest give every position.
+        digest = hashlib.blake2b(item.encode(), digest_size=16).digest()
+        h1, h2 = int.from_bytes(digest[:8], 'little'), int.from_bytes(digest[8:], 'little') | 1
+        return ((h1 + i * h2) % self.size for i in range(self.hashes))
+
+    def add(self, item):
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item):
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(item))
+
+class InboundEventLog:
+    """Lets each inbound event (a chat frame, or an order reaching a status) be handled once.
+
+    A handler asks seen() before doing anything, which only reads, and calls
+    record() in the unit of work holding the event's own writes, so the key
+    commits exactly when they do. External calls the event triggers run
+    after that commit, so a redelivery cannot repeat them. The dispatcher
+    runs one handler per order at a time, so nothing can record the same key
+    between the two calls.
+
+    seen() is answered without the database for nearly every new event: once
+    warm() has loaded the table into a Bloom filter, a key the filter has
+    never seen is known to be new, and only the filter's rare false
+    positives are checked with a SELECT. Recently seen keys are kept in an
+    LRU, so a redelivered event is turned away without touching the
+    database. A handler whose record() rolls back must discard() its order,
+    since the LRU cannot see rollbacks.
+    """
+
+    def __init__(self, maxsize=INBOUND_EVENT_CACHE_SIZE, filter_capacity=INBOUND_EVENT_FILTER_CAPACITY):
+        self.maxsize = maxsize
+        self._recent = OrderedDict()
+        self._filter = BloomFilter(filter_capacity)
+        self.is_warm = False
+        self.recorded = 0
+        self.duplicates = 0
+        self.cache_hits = 0
+        self.filter_misses = 0
+        self.lookups = 0
+
+    async def warm(self, conn):
+        """Load every recorded key into the filter so seen() can skip the table for new events."""
+        count = 0
+        async with conn.execute(SQL_SELECT_ALL_INBOUND_EVENTS) as cursor:
+            async for order_no, event_key in cursor:
+                self._filter.add(f"{order_no}\0{event_key}")
+                count += 1
+        self.is_warm = True
+        logger.info(f"Loaded {count} inbound event keys")
+
+    def _remember(self, key):
+        self._recent[key] = True
+        self._recent.move_to_end(key)
+        while len(self._recent) > self.maxsize:
+            self._recent.popitem(last=False)
+
+    async def seen(self, conn, order_no, event_key):
+        """Whether the event was already handled and should be skipped."""
+        key = (order_no, event_key)
+        if key in self._recent:
+            self._recent.move_to_end(key)
+            self.cache_hits += 1
+        elif self.is_warm and f"{order_no}\0{event_key}" not in self._filter:
+            self.filter_misses += 1
+            return False
+        else:
+            self.lookups += 1
+            async with conn.execute(SQL_SELECT_INBOUND_EVENT, key) as cursor:
+                if await cursor.fetchone() is None:
+                    return False
+            self._remember(key)
+        self.duplicates += 1
+        logger.info(f"Skipping duplicate event {event_key} for order {order_no}")
+        return True
+
+    async def record(self, conn, order_no, event_key):
+        """Mark the event handled; commits unless an enclosing unit of work will."""
+        key = (order_no, event_key)
+        cursor = await conn.execute(SQL_INSERT_INBOUND_EVENT, key)
+        inserted = cursor.rowcount == 1
+        await cursor.close()
+        await commit_if_needed(conn)
+        # Added even if the unit of work later rolls back: a stale bit only costs a SELECT.
+        self._filter.add(f"{order_no}\0{event_key}")
+        self._remember(key)
+        if inserted:
+            self.recorded += 1
+        return inserted
+
+    def discard(self, order_no):
+        """Forget the order's cached keys after its transaction rolled back."""
+        for key in [key for key in self._recent if key[0] == order_no]:
+            del self._recent[key]
+
+    def stats(self):
+        return {'recorded': self.recorded, 'duplicates': self.duplicates, 'cache_hits': self.cache_hits,
+                'filter_misses': self.filter_misses, 'lookups': self.lookups}
+
+inbound_events = InboundEventLog()
@@ -1,18 +1,38 @@
-from binance_msg_handler import handle_text_message, handle_system_notifications, handle_image_message
+from binance_msg_handler import handle_text_message, handle_system_notifications, handle_image_message, record_order_status_writes
 from binance_db_set import update_order_status
-from binance_db_get import get_order_details
+from binance_db_get import get_cached_order_details
 from binance_order_details import fetch_order_details
 from binance_db import insert_or_update_order
 import json
 from common_vars import status_map
 from binance_blacklist import is_blacklisted
+from binance_chat_frames import IGNORED_SELLER_NAMES, IGNORED_FIAT_UNITS
+from binance_inbound_events import inbound_events, frame_event_key, status_event_key
+from common_utils_db import unit_of_work
 from lang_utils import transaction_denied
 import traceback
 import logging
 logger = logging.getLogger(__name__)
 class MerchantAccount:
-    async def handle_message_by_type(self, connection_manager, KEY, SECRET, msg_json, msg_type, conn):
-        order_no = msg_json.get('orderNo', '')
+    async def handle_message_by_type(self, connection_manager, KEY, SECRET, frame, conn):
+        # Checked with a read up front and recorded once the frame is handled.
+        event_key = frame_event_key(frame.uuid) if frame.uuid else None
+        if event_key and await inbound_events.seen(conn, frame.order_no, event_key):
+            return
+        if frame.type == 'system':
+            # The status change commits with its own key in _apply_order_status.
+            await self._handle_frame(connection_manager, KEY, SECRET, frame, conn)
+            if event_key:
+                await inbound_events.record(conn, frame.order_no, event_key)
+            return
+        # Chat replies make no network calls after the order fetch (which writes nothing
+        # before it returns), so the frame's writes and its key commit together.
+        async with unit_of_work(conn):
+            await self._handle_frame(connection_manager, KEY, SECRET, frame, conn)
+            if event_key:
+                await inbound_events.record(conn, frame.order_no, event_key)
+    async def _handle_frame(self, connection_manager, KEY, SECRET, frame, conn):
+        order_no = frame.order_no
         order_details = await self._fetch_and_update_order_details(KEY, SECRET, conn, order_no)
         if not order_details:
             logger.warning("Failed to fetch order details from the external source.")
@@ -22,14 +42,14 @@ class MerchantAccount:
             logger.info(f"Order {order_no} uses payment method (OXXO or Skrill).")
             return  # Skip further processing for now
         
-        buyer_name = order_details.get('buyer_name')
-        if msg_type == 'system':
-            await self._handle_system_type(connection_manager, msg_json, conn, order_no, order_details, buyer_name)
+        buyer_name = order_details.buyer_name
+        if frame.type == 'system':
+            await self._handle_system_type(connection_manager, frame, conn, order_no, order_details, buyer_name)
         else:
-            await self._handle_other_types(connection_manager, msg_json, msg_type, conn, order_no, order_details, buyer_name)
-    async def _handle_system_type(self, connection_manager, msg_json, conn, order_no, order_details, buyer_name):
+            await self._handle_other_types(connection_manager, frame, conn, order_no, order_details, buyer_name)
+    async def _handle_system_type(self, connection_manager, frame, conn, order_no, order_details, buyer_name):
         try:
-            content = msg_json.get('content', '').lower()
+            content = frame.content.lower()
             content_dict = json.loads(content)
             system_type_str = content_dict.get('type', '')
             if system_type_str not in status_map:
@@ -39,43 +59,58 @@ class MerchantAccount:
         except json.JSONDecodeError:
             logger.error(f"Failed to decode JSON from content: {content}")
             return
-        if await is_blacklisted(conn, buyer_name):
-            await connection_manager.send_text_message(transaction_denied, order_no)
-            return
-        await update_order_status(conn, order_no, order_status)
-        order_details = await get_order_details(conn, order_no)
-        await handle_system_notifications(connection_manager, order_no, order_details, conn, order_status)
-    async def _handle_other_types(self, connection_manager, msg_json, msg_type, conn, order_no, order_details, buyer_name):
-        msg_status = msg_json.get('status')
-        if msg_status == 'read':
+        await self._apply_order_status(connection_manager, conn, order_no, buyer_name, order_status)
+    async def replay_order_status(self, connection_manager, KEY, SECRET, conn, order_no, order_status):
+        """Handle order_status as if its system notification had arrived on the chat socket."""
+        order_details = await self._fetch_and_update_order_details(KEY, SECRET, conn, order_no)
+        if not order_details:
+            logger.warning(f"Failed to fetch order details for {order_no} to replay status {order_status}.")
             return
-        uuid = msg_json.get('uuid', '')
-        is_self_message = uuid.startswith("self_")
-
-        if is_self_message:
-            logger.debug(f"Ignoring self message: {uuid}")
+        if await has_specific_bank_identifiers(conn, order_no, ['OXXO', 'SkrillMoneybookers']):
+            logger.info(f"Order {order_no} uses payment method (OXXO or Skrill).")
             return
-        if await is_blacklisted(conn, buyer_name):
+        await self._apply_order_status(connection_manager, conn, order_no, order_details.buyer_name, order_status)
+    async def _apply_order_status(self, connection_manager, conn, order_no, buyer_name, order_status):
+        # Live notifications and reconciliation replays share one key per status, so each applies once.
+        event_key = status_event_key(order_status)
+        if await inbound_events.seen(conn, order_no, event_key):
             return
-        seller_name = order_details.get('seller_name')
-        if seller_name == 'LOPEZ GUERRERO FRANCISCO JAVIER':
+        blacklisted = await is_blacklisted(conn, buyer_name)
+        # The status, its bookkeeping and its key commit together; replies, the BTC buy and
+        # the country check only run after that, so a redelivery cannot repeat them.
+        async with unit_of_work(conn):
+            # Stored for blacklisted buyers too, or reconciliation would keep seeing the status as missed.
+            await update_order_status(conn, order_no, order_status)
+            order_details = await get_cached_order_details(conn, order_no)
+            if not blacklisted:
+                await record_order_status_writes(conn, order_no, order_details, order_status)
+            await inbound_events.record(conn, order_no, event_key)
+        if blacklisted:
+            await connection_manager.send_text_message(transaction_denied, order_no)
+        else:
+            await handle_system_notifications(connection_manager, order_no, order_details, conn, order_status)
+    async def _handle_other_types(self, connection_manager, frame, conn, order_no, order_details, buyer_name):
+        # Read receipts and our own messages were dropped by chat_frame_filter; the ignore
+        # lists are checked again here for orders that were not cached when it ran.
+        if order_details.seller_name in IGNORED_SELLER_NAMES or order_details.fiat_unit in IGNORED_FIAT_UNITS:
             return
-        fiat_unit = order_details.get('fiat_unit')
-        if fiat_unit == 'USD':
+        if await is_blacklisted(conn, buyer_name):
             return
-        if msg_type == 'text':
-            content =  msg_json.get('content', '').lower()
+        if frame.type == 'text':
+            content = frame.content.lower()
             await handle_text_message(connection_manager, content, order_no, order_details, conn)
-        elif msg_type == 'image':
+        elif frame.type == 'image':
             await handle_image_message(connection_manager, order_no, order_details)
     async def _fetch_and_update_order_details(self, KEY, SECRET, conn, order_no):
         try:
-            order_details = await get_order_details(conn, order_no)
+            order_details = await get_cached_order_details(conn, order_no)
             if not order_details:
                 order_details = await fetch_order_details(KEY, SECRET, order_no)
                 if order_details:
-                    await insert_or_update_order(conn, order_details)
-                    order_details = await get_order_details(conn, order_no)
+                    # Written after the fetch, so the write lock is not held while waiting on the API.
+                    async with unit_of_work(conn):
+                        await insert_or_update_order(conn, order_details)
+                    order_details = await get_cached_order_details(conn, order_no)
                     return order_details
             return order_details
         except Exception as e:
@@ -88,4 +123,6 @@ async def has_specific_bank_identifiers(conn, order_no, identifiers):
             WHERE order_no = ? AND bank_identifier IN ({})
         """.format(','.join('?'*len(identifiers))), (order_no, *identifiers))
         result = await cursor.fetchone()
-        return result[0] > 0  # True if any of the specified identifiers are found
\ No newline at end of file
+        return result[0] > 0  # True if any of the specified identifiers are found
+
+merchant_account = MerchantAccount()
@@ -0,0 +1,72 @@
+from dataclasses import dataclass, fields, replace
+
+@dataclass(slots=True)
+class BookEntry:
+    """One ad from a P2P search result, parsed once where it leaves the API."""
+    adv_no: str
+    price: float
+    max_amount: float  # dynamicMaxSingleTransAmount
+    nick_name: str = None
+
+    @classmethod
+    def from_api(cls, item):
+        adv = item['adv']
+        return cls(adv['advNo'], float(adv['price']), float(adv['dynamicMaxSingleTransAmount']),
+                   (item.get('advertiser') or {}).get('nickName'))
+
+@dataclass(slots=True)
+class AdDetail:
+    """The fields of one of our ads' details the ads table keeps, parsed once where they leave the API."""
+    asset_type: str
+    floating_ratio: float
+    price: float
+    surplused_amount: float
+
+    @classmethod
+    def from_api(cls, data):
+        return cls(data['asset'], float(data['priceFloatingRatio']), float(data['price']), float(data['surplusAmount']))
+
+@dataclass(slots=True)
+class Ad:
+    """A row of the ads table. Field names match the columns."""
+    advNo: str
+    target_spot: int
+    asset_type: str
+    price: float
+    floating_ratio: float
+    last_updated: str
+    account: str
+    surplused_amount: float
+    fiat: str
+    transAmount: float
+    payTypes: list
+    Group: str
+
+    def copy(self):
+        return replace(self)
+
+@dataclass(slots=True)
+class Order:
+    """A row of the orders table. Field names match the columns."""
+    id: int
+    order_no: str
+    buyer_name: str
+    seller_name: str
+    trade_type: str
+    order_status: int
+    total_price: float
+    fiat_unit: str
+    asset: str
+    amount: float
+    account_number: str
+    menu_presented: bool
+    order_date: str
+    buyer_bank: str
+    seller_bank_account: str
+    merchant_id: int
+
+    def copy(self):
+        return replace(self)
+
+AD_COLUMNS = tuple(field.name for field in fields(Ad))
+ORDER_COLUMNS = tuple(field.name for field in fields(Order))
@@ -37,23 +37,29 @@ async def check_and_handle_country_restrictions(connection_manager, conn, order_
 
     return False
 
+async def record_order_status_writes(conn, order_no, order_details, order_status):
+    """The bookkeeping a status change makes, run in the unit of work that records its event key."""
+    if order_status != 4 or order_details is None:
+        return
+    await update_total_spent(conn, order_no)
+    amount_deposited = order_details.total_price
+    bank_account_number = await get_account_number(conn, order_no)
+    buyer_name = order_details.buyer_name
+    logger.debug(f"Logging deposit for {buyer_name} with bank account {bank_account_number} for {amount_deposited}")
+    await log_deposit(conn, buyer_name, bank_account_number, amount_deposited)
+
 async def handle_order_status_4(connection_manager, conn, order_no, order_details):
+    # The deposit was logged by record_order_status_writes; the buy runs once that committed.
     await generic_reply(connection_manager, order_no, order_details, 4)
-    asset_type = order_details.get('asset')
+    asset_type = order_details.asset
     logger.debug(asset_type)
     if asset_type == 'BTC':
         await binance_buy_order(asset_type)
-    await update_total_spent(conn, order_no)
-    amount_deposited = order_details.get('total_price')
-    bank_account_number = await get_account_number(conn, order_no)
-    buyer_name = order_details.get('buyer_name')
-    logger.debug(f"Logging deposit for {buyer_name} with bank account {bank_account_number} for {amount_deposited}")
-    await log_deposit(conn, buyer_name, bank_account_number, amount_deposited)
 
 
 
 async def handle_order_status_1(connection_manager, conn, order_no, order_details):
-    seller_name, buyer_name, fiat = order_details.get('seller_name'), order_details.get('buyer_name'), order_details.get('fiat_unit')
+    seller_name, buyer_name, fiat = order_details.seller_name, order_details.buyer_name, order_details.fiat_unit
     kyc_status = await get_kyc_status(conn, buyer_name)
     if kyc_status == 0 or kyc_status is None:
         anti_fraud_stage = await get_anti_fraud_stage(conn, buyer_name)
@@ -68,7 +74,7 @@ async def handle_order_status_1(connection_manager, conn, order_no, order_detail
         await send_messages(connection_manager, order_no, [payment_warning, payment_concept, payment_details])
 
 async def generic_reply(connection_manager, order_no, order_details, status_code):
-    buyer_name = order_details.get('buyer_name')
+    buyer_name = order_details.buyer_name
     current_language = determine_language(order_details)
     messages_to_send = await get_message_by_language(current_language, status_code, buyer_name)
     if messages_to_send is None:
@@ -94,12 +100,12 @@ async def handle_text_message(connection_manager, content, order_no, order_detai
         print("check_order_details returned False. Exiting function.")
         return
 
-    order_status = order_details.get('order_status')
+    order_status = order_details.order_status
     if order_status not in [1, 2]:
         logger.debug("Order not in 1 or 2")
         return
 
-    seller_name, buyer_name = order_details.get('seller_name'), order_details.get('buyer_name')
+    seller_name, buyer_name = order_details.seller_name, order_details.buyer_name
     kyc_status = await get_kyc_status(conn, buyer_name)
     anti_fraud_stage = await get_anti_fraud_stage(conn, buyer_name)
 
@@ -0,0 +1,63 @@
+import time
+import logging
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+ORDER_CACHE_SIZE = 1024
+ORDER_CACHE_TTL = 300  # seconds
+
+class OrderDetailsCache:
+    """Write-through LRU/TTL cache of Order rows keyed by order_no."""
+
+    def __init__(self, maxsize=ORDER_CACHE_SIZE, ttl=ORDER_CACHE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, order_no):
+        entry = self._entries.get(order_no)
+        if entry is None:
+            self.misses += 1
+            return None
+        row, expires_at = entry
+        if time.monotonic() >= expires_at:
+            del self._entries[order_no]
+            self.misses += 1
+            return None
+        self._entries.move_to_end(order_no)
+        self.hits += 1
+        return row.copy()
+
+    def peek(self, order_no):
+        """The cached row itself, without copying or counting a hit or miss. Callers must not modify it."""
+        entry = self._entries.get(order_no)
+        if entry is None or time.monotonic() >= entry[1]:
+            return None
+        return entry[0]
+
+    def put(self, order_no, row):
+        if row is None:
+            self.invalidate(order_no)
+            return
+        self._entries[order_no] = (row.copy(), time.monotonic() + self.ttl)
+        self._entries.move_to_end(order_no)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    def update(self, order_no, **fields):
+        """Apply a write to a cached row in place; no-op if the row is not cached."""
+        entry = self._entries.get(order_no)
+        if entry is not None:
+            for name, value in fields.items():
+                setattr(entry[0], name, value)
+
+    def invalidate(self, order_no):
+        self._entries.pop(order_no, None)
+
+    def clear(self):
+        self._entries.clear()
+
+order_cache = OrderDetailsCache()
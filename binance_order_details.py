@@ -1,7 +1,5 @@
 import asyncio
-import aiohttp
-from urllib.parse import urlencode
-from common_utils import get_server_timestamp, hashing
+from binance_client import get_client
 import os
 from dotenv import load_dotenv
 import logging
@@ -11,42 +9,13 @@ from binance_endpoints import USER_ORDER_DETAIL
 
 
 async def fetch_order_details(KEY, SECRET, order_no):
-    attempt_count = 0
-    max_attempts = 3
-    backoff_time = 1  # seconds
-
-    while attempt_count < max_attempts:
-        try:
-            timestamp = await get_server_timestamp()
-            payload = {"adOrderNo": order_no, "timestamp": timestamp}
-            query_string = urlencode(payload)
-            signature = hashing(query_string, SECRET)
-            headers = {
-                "Content-Type": "application/json;charset=utf-8",
-                "X-MBX-APIKEY": KEY,
-                "clientType": "WEB",
-            }
-            query_string += f"&signature={signature}"
-            async with aiohttp.ClientSession() as session:
-                async with session.post(f"{USER_ORDER_DETAIL}?{query_string}", json=payload, headers=headers) as response:
-                    if response.status == 200:
-                        response_data = await response.json()
-                        logger.debug("Fetched order details: success")
-                        return response_data
-                    else:
-                        logger.error(f"Request failed with status code {response.status}: {await response.text()}")
-                        attempt_count += 1
-                        await asyncio.sleep(backoff_time)
-                        continue  # Proceed to the next attempt
-
-        except Exception as e:
-            logger.exception(f"An error occurred on attempt {attempt_count + 1}: {e}")
-            attempt_count += 1
-            if attempt_count < max_attempts:
-                await asyncio.sleep(backoff_time)  # Wait before retrying
-            else:
-                logger.error("Maximum retry attempts reached. Aborting operation.")
-                return None 
+    payload = {"adOrderNo": order_no}
+    response_data = await get_client(KEY, SECRET).request("POST", USER_ORDER_DETAIL, params=payload, body=payload)
+    if response_data is None:
+        logger.error(f"Failed to fetch order details for {order_no}")
+        return None
+    logger.debug("Fetched order details: success")
+    return response_data
 
 
 
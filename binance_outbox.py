@@ -0,0 +1,89 @@
+import time
+import asyncio
+import logging
+from collections import deque
+
+logger = logging.getLogger(__name__)
+
+MESSAGE_INTERVAL = 5  # seconds a chat is held after each message of a paced batch
+BACKLOG_WARNING = 10
+
+class OutboundMessage:
+    def __init__(self, connection_manager, text, gap):
+        self.connection_manager = connection_manager
+        self.text = text
+        self.gap = gap
+        self.enqueued_at = time.monotonic()
+
+class OutboundMessageScheduler:
+    """Sends chat messages for each orderNo in the order they were queued.
+
+    Callers return as soon as a message is queued. Each order has one worker
+    task that writes its messages to the socket and waits out a message's gap
+    before the next one, so pacing never holds up the handler that queued it.
+    """
+
+    def __init__(self):
+        self._queues = {}
+        self._workers = {}
+        self.sent = 0
+        self.failed = 0
+        self.max_backlog_seen = 0
+        self.total_latency = 0.0
+        self.max_latency = 0.0
+
+    def enqueue(self, connection_manager, order_no, text, gap=0):
+        """Queue text for order_no; the next message for the order waits gap seconds after it is sent."""
+        queue = self._queues.get(order_no)
+        if queue is None:
+            queue = self._queues[order_no] = deque()
+        queue.append(OutboundMessage(connection_manager, text, gap))
+        self.max_backlog_seen = max(self.max_backlog_seen, len(queue))
+        if len(queue) >= BACKLOG_WARNING:
+            logger.warning(f"Order {order_no} has {len(queue)} messages waiting to be sent")
+        if order_no not in self._workers:
+            self._workers[order_no] = asyncio.create_task(self._worker(order_no, queue))
+
+    async def _worker(self, order_no, queue):
+        try:
+            while queue:
+                message = queue.popleft()
+                try:
+                    delivered = await message.connection_manager.write_text_message(message.text, order_no)
+                except Exception as e:
+                    delivered = False
+                    logger.exception(f"Sending a message for order {order_no} failed: {e}")
+                if delivered:
+                    latency = time.monotonic() - message.enqueued_at
+                    self.sent += 1
+                    self.total_latency += latency
+                    self.max_latency = max(self.max_latency, latency)
+                else:
+                    self.failed += 1
+                if message.gap:
+                    await asyncio.sleep(message.gap)
+        finally:
+            self._workers.pop(order_no, None)
+            if not queue:
+                self._queues.pop(order_no, None)
+
+    def backlog(self):
+        return {order_no: len(queue) for order_no, queue in self._queues.items() if queue}
+
+    def stats(self):
+        backlog = self.backlog()
+        return {
+            'active_orders': len(self._workers),
+            'backlog': sum(backlog.values()),
+            'max_backlog_seen': self.max_backlog_seen,
+            'sent': self.sent,
+            'failed': self.failed,
+            'avg_latency': self.total_latency / self.sent if self.sent else 0.0,
+            'max_latency': self.max_latency,
+        }
+
+    async def join(self):
+        while self._workers:
+            await asyncio.gather(*list(self._workers.values()), return_exceptions=True)
+
+outbound_messages = OutboundMessageScheduler()
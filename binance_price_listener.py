@@ -1,23 +1,41 @@
 import asyncio
 import websockets
 import json
+import logging
 from datetime import datetime
 
+logger = logging.getLogger(__name__)
+
 class BinancePriceListener:
-    def __init__(self, symbol):
+    def __init__(self, symbol, move_threshold=None):
         self.symbol = symbol.upper()
         self.last_price = None
+        # Callbacks run with the new price whenever it moves move_threshold (a fraction) away from the last reported price.
+        self.move_threshold = move_threshold
+        self.reference_price = None
+        self.move_callbacks = []
         self.ws_url = f"wss://stream.binance.com:9443/ws/{self.symbol.lower()}@aggTrade"
         self.reconnect_interval = 24 * 60 * 60  # 24 hours
 
     async def start(self):
         await self.run_forever()
 
+    def add_move_callback(self, callback):
+        self.move_callbacks.append(callback)
+
     async def process_msg_stream(self, message):
-        current_time = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        print(f"[{current_time}] Received Message: {message}")  # Debug print
+        logger.debug(f"Received Message: {message}")
         msg = json.loads(message)
         self.last_price = float(msg['p'])
+        if not self.move_threshold or not self.move_callbacks:
+            return
+        if self.reference_price is None:
+            self.reference_price = self.last_price
+        elif abs(self.last_price / self.reference_price - 1) >= self.move_threshold:
+            logger.debug(f"{self.symbol} moved from {self.reference_price} to {self.last_price}")
+            self.reference_price = self.last_price
+            for callback in self.move_callbacks:
+                callback(self.last_price)
 
 
     async def run_forever(self):
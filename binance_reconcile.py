@@ -0,0 +1,147 @@
+import asyncio
+import logging
+from binance_client import get_client
+from binance_db_get import get_order_details, get_order_statuses, get_reconcile_cursor
+from binance_db_set import set_reconcile_cursor
+from binance_dispatcher import order_dispatcher
+from binance_endpoints import ORDER_HISTORY
+from binance_inbound_events import inbound_events
+from binance_merchant_handler import merchant_account
+from binance_order_cache import order_cache
+from common_utils import server_timestamp
+from common_utils_db import get_pool
+from common_vars import DB_FILE
+
+logger = logging.getLogger(__name__)
+
+RECONCILE_LOOKBACK = 3 * 60 * 60 * 1000  # ms; orders created this long before the cursor may still be changing
+RECONCILE_PAGE_ROWS = 50
+RECONCILE_MAX_PAGES = 20
+RECONCILE_INTERVAL = 5 * 60  # seconds between sweeps
+
+# Order history statuses as the status_map values their system notifications carry.
+HISTORY_STATUS_MAP = {
+    'SELL': {'TRADING': 1, 'BUYER_PAYED': 2, 'COMPLETED': 4, 'IN_APPEAL': 5, 'CANCELLED': 6, 'CANCELLED_BY_SYSTEM': 7},
+    'BUY': {'TRADING': 3, 'BUYER_PAYED': 8, 'COMPLETED': 4, 'IN_APPEAL': 5, 'CANCELLED': 6, 'CANCELLED_BY_SYSTEM': 7},
+}
+
+def history_status(order):
+    return HISTORY_STATUS_MAP.get(order.get('tradeType'), {}).get(order.get('orderStatus'))
+
+async def fetch_order_history(KEY, SECRET, start_timestamp, page=1, rows=RECONCILE_PAGE_ROWS):
+    """One page of orders created since start_timestamp (ms), or None on failure."""
+    params = {'startTimestamp': start_timestamp, 'page': page, 'rows': rows}
+    response = await get_client(KEY, SECRET).request("GET", ORDER_HISTORY, params=params)
+    if response is None or not isinstance(response.get('data'), list):
+        logger.error(f"Failed to fetch order history since {start_timestamp}, page {page}: {response}")
+        return None
+    return response['data']
+
+class OrderReconciler:
+    """Replays order status changes the chat socket missed, using the order history endpoint.
+
+    Every RECONCILE_INTERVAL, and whenever trigger() is called, it reads the
+    order history from the account's stored cursor back RECONCILE_LOOKBACK.
+    It compares each order's status with the orders table and replays the
+    ones that differ. A replay writes the status it applies, so running over
+    the same history twice is harmless. A status that is still missing after
+    it was replayed once (an order the handlers skip, such as OXXO or Skrill
+    payments) is not replayed again.
+    """
+
+    def __init__(self, KEY, SECRET, account):
+        self.KEY = KEY
+        self.SECRET = SECRET
+        self.account = account
+        self._wake = asyncio.Event()
+        self._replayed = {}  # order_no: the status last replayed for it
+        self.sweeps = 0
+        self.checked = 0
+        self.replayed = 0
+        self.failed = 0
+
+    async def fetch_history_since(self, since):
+        """(orders created since `since` in ms, whether that is all of them), or (None, False) if a page failed."""
+        orders = []
+        for page in range(1, RECONCILE_MAX_PAGES + 1):
+            rows = await fetch_order_history(self.KEY, self.SECRET, since, page)
+            if rows is None:
+                return None, False
+            orders.extend(rows)
+            if len(rows) < RECONCILE_PAGE_ROWS:
+                return orders, True
+        logger.warning(f"Order history since {since} is longer than {RECONCILE_MAX_PAGES} pages; older orders wait for the next sweep")
+        return orders, False
+
+    async def reconcile_since(self, connection_manager, since):
+        """Queue replays for orders created since `since` (ms) whose status the orders table lacks.
+
+        Returns whether the whole history since then was checked.
+        """
+        orders, complete = await self.fetch_history_since(since)
+        if orders is None:
+            return False
+        # History is newest first, so the first status seen for an order is its latest.
+        remote = {}
+        for order in orders:
+            order_no, status = order.get('orderNumber'), history_status(order)
+            if order_no and status is not None:
+                remote.setdefault(order_no, status)
+        async with get_pool(DB_FILE).connection() as conn:
+            local = await get_order_statuses(conn, list(remote))
+        # Forget orders that left the history window so the map stays bounded.
+        self._replayed = {order_no: status for order_no, status in self._replayed.items() if order_no in remote}
+        missed = {order_no: status for order_no, status in remote.items()
+                  if local.get(order_no) != status and self._replayed.get(order_no) != status}
+        self.checked += len(remote)
+        for order_no, status in missed.items():
+            # Through the dispatcher, so a replay runs in order with live frames for the same order.
+            await order_dispatcher.submit(order_no, self._replay, connection_manager, order_no, status)
+        logger.info(f"Reconciled {len(remote)} orders since {since}, {len(missed)} to replay: {self.stats()}")
+        return complete
+
+    async def sweep(self, connection_manager):
+        started = server_timestamp()
+        async with get_pool(DB_FILE).connection() as conn:
+            cursor = await get_reconcile_cursor(conn, self.account)
+        since = (cursor if cursor is not None else started) - RECONCILE_LOOKBACK
+        if await self.reconcile_since(connection_manager, since):
+            async with get_pool(DB_FILE).transaction() as conn:
+                await set_reconcile_cursor(conn, self.account, started)
+        self.sweeps += 1
+
+    def trigger(self):
+        """Run a sweep now rather than at the next interval."""
+        self._wake.set()
+
+    async def run(self, connection_manager):
+        while True:
+            try:
+                await self.sweep(connection_manager)
+            except Exception as e:
+                logger.exception(f"Order reconciliation sweep failed: {e}")
+            try:
+                await asyncio.wait_for(self._wake.wait(), RECONCILE_INTERVAL)
+            except asyncio.TimeoutError:
+                pass
+            self._wake.clear()
+
+    async def _replay(self, connection_manager, order_no, status):
+        try:
+            # Not a transaction: the replay calls the API, see handle_message in binance_c2c.
+            async with get_pool(DB_FILE).connection() as conn:
+                local = await get_order_details(conn, order_no)
+                if local is not None and local.order_status == status:
+                    return
+                logger.info(f"Replaying missed status {status} for order {order_no} (had {local.order_status if local else None})")
+                await merchant_account.replay_order_status(connection_manager, self.KEY, self.SECRET, conn, order_no, status)
+                self._replayed[order_no] = status
+                self.replayed += 1
+        except Exception as e:
+            self.failed += 1
+            order_cache.invalidate(order_no)
+            inbound_events.discard(order_no)
+            logger.exception(f"Replaying status {status} for order {order_no} failed, rolled back: {e}")
+
+    def stats(self):
+        return {'sweeps': self.sweeps, 'checked': self.checked, 'replayed': self.replayed, 'failed': self.failed}
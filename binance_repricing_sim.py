@@ -0,0 +1,145 @@
+import sys
+import time
+import asyncio
+import logging
+import argparse
+from contextlib import contextmanager
+import binance_update_ads
+from binance_ad_updates import AD_UPDATE_RATIO_TICK
+from binance_book import ColumnarBook
+from binance_book_recorder import load_recording
+from binance_models import Ad, BookEntry
+
+logger = logging.getLogger(__name__)
+
+# Module-level pricing parameters of binance_update_ads a run may override.
+SIM_PARAMETERS = ('PRICE_THRESHOLD', 'MIN_RATIO', 'MAX_RATIO', 'RATIO_ADJUSTMENT', 'DIFF_THRESHOLD', 'AMOUNT_THRESHOLD')
+
+@contextmanager
+def patched_parameters(**params):
+    unknown = params.keys() - set(SIM_PARAMETERS)
+    if unknown:
+        raise ValueError(f"Unknown pricing parameters: {sorted(unknown)}")
+    saved = {name: getattr(binance_update_ads, name) for name in params}
+    for name, value in params.items():
+        setattr(binance_update_ads, name, value)
+    try:
+        yield
+    finally:
+        for name, value in saved.items():
+            setattr(binance_update_ads, name, value)
+
+class SimulatedAd:
+    """One of our ads as the simulation sees it: the ratio the strategy last set, and its history."""
+
+    def __init__(self, advNo, ratio):
+        self.advNo = advNo
+        self.ratio = ratio
+        self.ranks = []  # (t, rank) per snapshot the ad was in
+        self.margins = []
+        self.updates = 0
+        self.suppressed = 0
+
+    def summary(self):
+        ranks = [rank for _, rank in self.ranks]
+        return {
+            'snapshots': len(ranks),
+            'mean_rank': sum(ranks) / len(ranks) if ranks else None,
+            'best_rank': min(ranks, default=None),
+            'worst_rank': max(ranks, default=None),
+            'updates': self.updates,
+            'suppressed': self.suppressed,
+            'mean_margin': sum(self.margins) / len(self.margins) if self.margins else None,
+            'final_ratio': self.ratio,
+        }
+
+class SimulatedUpdates:
+    """Stands in for ad_update_queue: every update outside the tick is confirmed at once."""
+
+    def __init__(self, ads, tick=AD_UPDATE_RATIO_TICK):
+        self.ads = ads
+        self.tick = tick
+
+    def submit(self, ad, api_instance, ratio, price):
+        sim_ad = self.ads[ad.advNo]
+        if abs(ratio - sim_ad.ratio) < self.tick:
+            sim_ad.suppressed += 1
+            return
+        sim_ad.ratio = ratio
+        sim_ad.updates += 1
+
+async def replay(snapshots, **params):
+    """Replay recorded snapshots through analyze_and_update_ads and return ({advNo: SimulatedAd}, stats).
+
+    Our own ads are repriced from the base price implied by their recorded price
+    and ratio; competitors keep their recorded prices, so the replay does not
+    model how they would have reacted to us.
+    """
+    sim_ads = {}
+    updates = SimulatedUpdates(sim_ads)
+    replayed = 0
+    started = time.perf_counter()
+    with patched_parameters(**params):
+        for snapshot in snapshots:
+            replayed += 1
+            asset_type, fiat, transAmount, payTypes = snapshot['k']
+            own = snapshot['o']
+            rows = snapshot['a']
+            positions = {row[0]: i for i, row in enumerate(rows)}
+            ads = [BookEntry(advNo, price, max_amount) for advNo, price, max_amount in rows]
+            for advNo, (recorded_ratio, target_spot) in own.items():
+                position = positions.get(advNo)
+                if position is None:
+                    continue
+                sim_ad = sim_ads.setdefault(advNo, SimulatedAd(advNo, float(recorded_ratio)))
+                base_price = rows[position][1] / (float(recorded_ratio) / 100)
+                ads[position].price = round(base_price * sim_ad.ratio / 100, 2)
+
+            book = ColumnarBook(ads, frozenset(own))
+            for advNo, (_, target_spot) in own.items():
+                if advNo not in positions:
+                    continue
+                sim_ad = sim_ads[advNo]
+                ad = Ad(advNo=advNo, target_spot=target_spot, asset_type=asset_type, price=None, floating_ratio=sim_ad.ratio,
+                        last_updated=None, account=None, surplused_amount=0, fiat=fiat, transAmount=transAmount, payTypes=payTypes, Group=None)
+                await binance_update_ads.analyze_and_update_ads(ad, None, book, update_queue=updates)
+                base_price = rows[positions[advNo]][1] / (float(own[advNo][0]) / 100)
+                our_price = round(base_price * sim_ad.ratio / 100, 2)
+                competitors = book.competitors(0, binance_update_ads.AMOUNT_THRESHOLD)
+                rank = 1 + int((book.prices[competitors] < our_price).sum())
+                sim_ad.ranks.append((snapshot['t'], rank))
+                sim_ad.margins.append(sim_ad.ratio - 100)
+    elapsed = time.perf_counter() - started
+    stats = {
+        'snapshots': replayed,
+        'seconds': elapsed,
+        'snapshots_per_second': replayed / elapsed if elapsed else None,
+        'updates': sum(sim_ad.updates for sim_ad in sim_ads.values()),
+    }
+    return sim_ads, stats
+
+def print_report(sim_ads, stats):
+    print(f"Replayed {stats['snapshots']} snapshots in {stats['seconds']:.2f}s "
+          f"({stats['snapshots_per_second']:.0f}/s), {stats['updates']} ad updates")
+    for advNo, sim_ad in sim_ads.items():
+        summary = sim_ad.summary()
+        if not summary['snapshots']:
+            continue
+        print(f"{advNo}: mean rank {summary['mean_rank']:.2f} (best {summary['best_rank']}, worst {summary['worst_rank']}), "
+              f"{summary['updates']} updates, {summary['suppressed']} suppressed, "
+              f"mean margin {summary['mean_margin']:.3f}%, final ratio {summary['final_ratio']}")
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Replay a book recording through the repricing strategy.")
+    parser.add_argument('recording', help="a file written by BookRecorder (BOOK_RECORDING_PATH)")
+    for name in SIM_PARAMETERS:
+        parser.add_argument(f"--{name.lower().replace('_', '-')}", dest=name, type=float)
+    args = parser.parse_args(argv)
+    params = {name: getattr(args, name) for name in SIM_PARAMETERS if getattr(args, name) is not None}
+    # analyze_and_update_ads logs every competitor it picks; keep the replay quiet and fast.
+    logging.getLogger(binance_update_ads.__name__).setLevel(logging.WARNING)
+    sim_ads, stats = asyncio.run(replay(load_recording(args.recording), **params))
+    print_report(sim_ads, stats)
+
+if __name__ == "__main__":
+    main(sys.argv[1:])
@@ -1,88 +1,39 @@
-import aiohttp
 import asyncio
 from credentials import credentials_dict
-from common_utils import get_server_timestamp, hashing
+from binance_client import get_client
 import logging
 from binance_endpoints import SEARCH_ADS
-from datetime import datetime, timedelta
+from binance_search_cache import search_cache
+from binance_book import BOOK_PAGE_ROWS
 
 logger = logging.getLogger(__name__)
 
-# Initialize a cache dictionary
-cache = {}
-
-async def search_ads(KEY, SECRET, asset_type, fiat, transAmount, payTypes=None):
-    global cache
-
-    # Create a cache key based on the function's arguments
-    cache_key = (asset_type, fiat, transAmount, tuple(sorted(payTypes)) if payTypes else None)
-
-    # Check if these parameters are in the cache and if the cached result is less than 10 seconds old
-    if cache_key in cache:
-        cached_result, timestamp = cache[cache_key]
-        if datetime.now() - timestamp < timedelta(seconds=30):
-            logger.debug("Returning cached result")
-            return cached_result
-
-    attempts = 0
-    max_attempts = 3
-
-    while attempts < max_attempts:
-        attempts += 1
-        try:
-            timestamp = str(await get_server_timestamp())
-
-            payload = {
-                "asset": asset_type,
-                "fiat": fiat,
-                "page": 1,
-                "publisherType": "merchant",
-                "rows": 20,
-                "tradeType": "BUY",
-                "transAmount": transAmount,
-            }
-            
-            if payTypes:
-                payload["payTypes"] = payTypes
-
-            query_string = f"timestamp={timestamp}"
-            signature = hashing(query_string, SECRET)
-
-            full_url = f"{SEARCH_ADS}?{query_string}&signature={signature}"
-
-            headers = {
-                "Content-Type": "application/json;charset=utf-8",
-                "X-MBX-APIKEY": KEY,
-                "clientType": "WEB",
-            }
-            
-            async with aiohttp.ClientSession() as session:
-                logger.debug(f'Calling fetch_ads_search for {asset_type} {fiat} {transAmount} {payTypes}')
-                async with session.post(full_url, json=payload, headers=headers) as response:
-                    if response.status == 200:
-                        response_data = await response.json()
-                        logger.debug("Fetched ads search: success")
-
-                        # Cache the result along with the current timestamp
-                        cache[cache_key] = (response_data, datetime.now())
-                        
-                        return response_data
-                    else:
-                        logger.error(f"Request failed with status code {response.status}: {await response.text()}")
-                        return None
-
-        except Exception as e:
-            logger.error(f"An error occurred: {e}")
-            if attempts >= max_attempts:
-                logger.error("Maximum retry attempts reached, failing...")
-                return None
-            else:
-                logger.info(f"Attempt {attempts}/{max_attempts} failed, retrying after delay...")
-                await asyncio.sleep(2 ** attempts)  # Exponential backoff
-
-    logger.error("Failed to complete request after maximum attempts.")
-    return None
-            
+async def fetch_search_ads(KEY, SECRET, asset_type, fiat, transAmount, payTypes=None, page=1):
+    payload = {
+        "asset": asset_type,
+        "fiat": fiat,
+        "page": page,
+        "publisherType": "merchant",
+        "rows": BOOK_PAGE_ROWS,
+        "tradeType": "BUY",
+        "transAmount": transAmount,
+    }
+    if payTypes:
+        payload["payTypes"] = payTypes
+
+    logger.debug(f'Calling fetch_ads_search for {asset_type} {fiat} {transAmount} {payTypes} page {page}')
+    response_data = await get_client(KEY, SECRET).request("POST", SEARCH_ADS, body=payload)
+    if response_data is None:
+        logger.error(f"Failed to fetch ads search for {asset_type} {fiat} {transAmount} {payTypes}")
+        return None
+    logger.debug("Fetched ads search: success")
+    return response_data
+
+async def search_ads(KEY, SECRET, asset_type, fiat, transAmount, payTypes=None, page=1):
+    # Keyed on the search only, so every account competing in the same book shares one request.
+    cache_key = (asset_type, fiat, transAmount, tuple(sorted(payTypes)) if payTypes else None, page)
+    return await search_cache.get_or_fetch(
+        cache_key, lambda: fetch_search_ads(KEY, SECRET, asset_type, fiat, transAmount, payTypes, page))
 
 if __name__ == "__main__":
     import sys
@@ -0,0 +1,96 @@
+import asyncio
+import time
+import logging
+from collections import OrderedDict
+
+logger = logging.getLogger(__name__)
+
+SEARCH_CACHE_SIZE = 256
+# For ad-hoc searches through search_ads. The repricing scheduler fetches its books uncached:
+# it needs the live book on every poll, and group_by_book already shares each search.
+SEARCH_CACHE_TTL = 5  # seconds an entry is served as fresh
+SEARCH_CACHE_STALE_TTL = 8  # seconds an entry may be served while it is refetched in the background
+
+class SearchCache:
+    """Bounded LRU/TTL cache of ad searches with single-flight fetches and stale-while-revalidate."""
+
+    def __init__(self, maxsize=SEARCH_CACHE_SIZE, ttl=SEARCH_CACHE_TTL, stale_ttl=SEARCH_CACHE_STALE_TTL):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self.stale_ttl = stale_ttl
+        self._entries = OrderedDict()
+        self._inflight = {}
+        self.hits = 0
+        self.stale_hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def _lookup(self, key):
+        entry = self._entries.get(key)
+        if entry is None:
+            return None, False
+        value, fetched_at = entry
+        age = time.monotonic() - fetched_at
+        if age >= self.stale_ttl:
+            del self._entries[key]
+            return None, False
+        self._entries.move_to_end(key)
+        return value, age < self.ttl
+
+    def _store(self, key, value):
+        self._entries[key] = (value, time.monotonic())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.maxsize:
+            self._entries.popitem(last=False)
+
+    async def _run_fetch(self, key, fetch):
+        try:
+            value = await fetch()
+            if value is not None:
+                self._store(key, value)
+            return value
+        except Exception as e:
+            logger.error(f"Search fetch failed for {key}: {e}")
+            return None
+        finally:
+            self._inflight.pop(key, None)
+
+    def _start_fetch(self, key, fetch):
+        """Return the in-flight fetch for key, starting one if needed, and whether it was already running."""
+        task = self._inflight.get(key)
+        if task is not None:
+            return task, True
+        task = self._inflight[key] = asyncio.ensure_future(self._run_fetch(key, fetch))
+        return task, False
+
+    async def get_or_fetch(self, key, fetch):
+        """Return the cached value for key, calling fetch() at most once at a time per key on a miss."""
+        value, fresh = self._lookup(key)
+        if value is not None:
+            if fresh:
+                self.hits += 1
+            else:
+                self.stale_hits += 1
+                self._start_fetch(key, fetch)
+            return value
+        task, joined = self._start_fetch(key, fetch)
+        if joined:
+            self.coalesced += 1
+        else:
+            self.misses += 1
+        # Shielded so a cancelled caller does not cancel the fetch other callers are waiting on.
+        return await asyncio.shield(task)
+
+    def stats(self):
+        return {
+            'entries': len(self._entries),
+            'hits': self.hits,
+            'stale_hits': self.stale_hits,
+            'misses': self.misses,
+            'coalesced': self.coalesced,
+        }
+
+    def clear(self):
+        self._entries.clear()
+
+search_cache = SearchCache()
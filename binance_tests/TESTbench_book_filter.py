@@ -0,0 +1,51 @@
+import random
+import timeit
+from binance_book import ColumnarBook
+from binance_models import BookEntry
+from binance_update_ads import filter_ads, PRICE_THRESHOLD, AMOUNT_THRESHOLD
+
+BOOK_SIZE = 1000
+OWN_ADS = 20
+ANALYSES_PER_BOOK = 10  # ads of ours priced against the same book
+REPEAT = 200
+
+def make_book():
+    ads = [{'adv': {'advNo': str(10**19 + i),
+                    'price': f"{18 + i * 0.005 + random.uniform(0, 0.01):.2f}",
+                    'dynamicMaxSingleTransAmount': str(random.choice([1000, 4000, 8000, 50000]))}}
+           for i in range(BOOK_SIZE)]
+    own_ads = [{'advNo': ad['adv']['advNo']} for ad in random.sample(ads, OWN_ADS)]
+    return ads, own_ads
+
+def list_filter(ads_data, base_price, own_ads):
+    # The list-based filter and own-ad lookup this replaced.
+    own_adv_nos = [ad['advNo'] for ad in own_ads]
+    return [ad for ad in ads_data
+            if ad['adv']['advNo'] not in own_adv_nos
+            and float(ad['adv']['price']) >= base_price * PRICE_THRESHOLD
+            and float(ad['adv']['dynamicMaxSingleTransAmount']) >= AMOUNT_THRESHOLD]
+
+def list_analyses(ads, own_ads):
+    for own in own_ads[:ANALYSES_PER_BOOK]:
+        ours = next(item for item in ads if item['adv']['advNo'] == own['advNo'])
+        filtered = list_filter(ads, float(ours['adv']['price']) / 1.02, own_ads)
+        filtered[min(5, len(filtered)) - 1]
+
+def columnar_analyses(ads, own_ads):
+    book = ColumnarBook([BookEntry.from_api(item) for item in ads], frozenset(ad['advNo'] for ad in own_ads))
+    for own in own_ads[:ANALYSES_PER_BOOK]:
+        filtered = filter_ads(book, float(book.prices[book.position(own['advNo'])]) / 1.02)
+        book.ads[filtered[min(5, len(filtered)) - 1]]
+
+def main():
+    ads, own_ads = make_book()
+    book = ColumnarBook([BookEntry.from_api(item) for item in ads], frozenset(ad['advNo'] for ad in own_ads))
+    base_price = float(ads[BOOK_SIZE // 2]['adv']['price']) / 1.02
+    assert [ads[i] for i in filter_ads(book, base_price)] == list_filter(ads, base_price, own_ads)
+
+    for label, analyses in (("list filter", list_analyses), ("columnar book", columnar_analyses)):
+        seconds = timeit.timeit(lambda: analyses(ads, own_ads), number=REPEAT) / REPEAT
+        print(f"{label:<14} {seconds * 1000:7.3f} ms per {BOOK_SIZE}-ad book ({ANALYSES_PER_BOOK} analyses)")
+
+if __name__ == "__main__":
+    main()
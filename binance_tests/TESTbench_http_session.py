@@ -0,0 +1,60 @@
+import asyncio
+import statistics
+import time
+import aiohttp
+from aiohttp import web
+from common_utils_http import get_http_session, close_http_session
+
+REQUESTS = 500
+CONCURRENCY = 10
+
+async def stub_handler(request):
+    return web.json_response({'code': '000000', 'data': {'serverTime': int(time.time() * 1000)}})
+
+async def start_stub_server():
+    app = web.Application()
+    app.router.add_route('*', '/{tail:.*}', stub_handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, '127.0.0.1', 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}/sapi/v1/c2c/ads/search"
+
+async def per_call_session(url):
+    async with aiohttp.ClientSession() as session:
+        async with session.post(url, json={}) as response:
+            return await response.json()
+
+async def shared_session(url):
+    session = get_http_session()
+    async with session.post(url, json={}) as response:
+        return await response.json()
+
+async def run_bench(label, call, url):
+    latencies = []
+    semaphore = asyncio.Semaphore(CONCURRENCY)
+
+    async def timed():
+        async with semaphore:
+            start = time.perf_counter()
+            await call(url)
+            latencies.append((time.perf_counter() - start) * 1000)
+
+    await asyncio.gather(*(timed() for _ in range(REQUESTS)))
+    latencies.sort()
+    p50 = statistics.median(latencies)
+    p99 = latencies[int(len(latencies) * 0.99) - 1]
+    print(f"{label:<18} p50={p50:.2f}ms p99={p99:.2f}ms")
+
+async def main():
+    runner, url = await start_stub_server()
+    try:
+        await run_bench("per-call session", per_call_session, url)
+        await run_bench("shared session", shared_session, url)
+    finally:
+        await close_http_session()
+        await runner.cleanup()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,81 @@
+import gc
+import random
+import sqlite3
+import timeit
+import tracemalloc
+from binance_db import SQL_CREATE_ORDERS_TABLE
+from binance_db_get import SQL_SELECT_ORDER, order_row_factory
+from binance_models import BookEntry, ORDER_COLUMNS
+
+BOOK_SIZE = 5000
+ORDERS = 100_000
+PASSES = 10  # times a book is scanned per repricing round
+AMOUNT_THRESHOLD = 5000
+
+def make_search_result():
+    # Shaped like the P2P search response, strings and all.
+    return [{'adv': {'advNo': str(10**19 + i), 'price': f"{18 + i * 0.001:.2f}", 'dynamicMaxSingleTransAmount': str(random.choice([1000, 8000, 50000])),
+                     'minSingleTransAmount': '100', 'tradeMethods': [{'identifier': 'BANK'}], 'asset': 'USDT', 'fiatUnit': 'MXN'},
+             'advertiser': {'nickName': f"merchant{i}", 'monthOrderCount': 100, 'monthFinishRate': 0.99}}
+            for i in range(BOOK_SIZE)]
+
+def measure(build):
+    gc.collect()
+    tracemalloc.start()
+    kept = build()
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return kept, size
+
+def bench_book():
+    result = make_search_result()
+    entries, entries_size = measure(lambda: [BookEntry.from_api(item) for item in result])
+    # The raw result is what every layer held before; count it as a deep copy of the same data.
+    _, raw_size = measure(lambda: [{'adv': dict(item['adv']), 'advertiser': dict(item['advertiser'])} for item in result])
+
+    def scan_raw():
+        for _ in range(PASSES):
+            [item for item in result if float(item['adv']['dynamicMaxSingleTransAmount']) >= AMOUNT_THRESHOLD and float(item['adv']['price']) >= 18]
+
+    def scan_entries():
+        for _ in range(PASSES):
+            [entry for entry in entries if entry.max_amount >= AMOUNT_THRESHOLD and entry.price >= 18]
+
+    raw_time = timeit.timeit(scan_raw, number=5) / 5
+    entries_time = timeit.timeit(scan_entries, number=5) / 5
+    print(f"book of {BOOK_SIZE}: raw dicts {raw_size / 1024:8.0f} KiB {raw_time * 1000:7.2f} ms | "
+          f"BookEntry {entries_size / 1024:8.0f} KiB {entries_time * 1000:7.2f} ms  ({PASSES} scans)")
+
+def bench_orders():
+    conn = sqlite3.connect(':memory:')
+    conn.execute(SQL_CREATE_ORDERS_TABLE)
+    conn.executemany("INSERT INTO orders (order_no, buyer_name, seller_name, trade_type, order_status, total_price, fiat_unit, asset, amount) VALUES (?, ?, ?, 'SELL', 4, ?, 'MXN', 'USDT', ?)",
+                     [(str(i), f"buyer {i % 500}", 'seller', random.uniform(100, 50000), random.uniform(5, 2500)) for i in range(ORDERS)])
+    sql = SQL_SELECT_ORDER.split(' WHERE ')[0]
+
+    def as_dicts():
+        cursor = conn.execute(sql)
+        column_names = [desc[0] for desc in cursor.description]
+        return [{column_names[i]: row[i] for i in range(len(row))} for row in cursor.fetchall()]
+
+    def as_orders():
+        cursor = conn.cursor()
+        cursor.row_factory = order_row_factory
+        return cursor.execute(sql).fetchall()
+
+    dicts, dicts_size = measure(as_dicts)
+    orders, orders_size = measure(as_orders)
+    assert [tuple(d[c] for c in ORDER_COLUMNS) for d in dicts[:100]] == [tuple(getattr(o, c) for c in ORDER_COLUMNS) for o in orders[:100]]
+    del dicts, orders
+    dicts_time = timeit.timeit(lambda: sum(d['total_price'] for d in as_dicts() if d['order_status'] == 4), number=3) / 3
+    orders_time = timeit.timeit(lambda: sum(o.total_price for o in as_orders() if o.order_status == 4), number=3) / 3
+    print(f"{ORDERS} orders: dict rows {dicts_size / 1024:8.0f} KiB {dicts_time * 1000:7.2f} ms | "
+          f"Order rows {orders_size / 1024:8.0f} KiB {orders_time * 1000:7.2f} ms  (load and sum)")
+    conn.close()
+
+def main():
+    bench_book()
+    bench_orders()
+
+if __name__ == "__main__":
+    main()
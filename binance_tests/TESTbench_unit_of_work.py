@@ -0,0 +1,73 @@
+import asyncio
+import os
+import tempfile
+import time
+from contextlib import asynccontextmanager
+from common_utils_db import create_connection, unit_of_work, DB_PRAGMAS
+from binance_db_migrations import migrate_database, ORDERS_DB_MIGRATIONS
+from binance_db_get import get_order_details
+from binance_db_set import update_order_status, set_menu_presented, update_buyer_bank, update_kyc_status, update_anti_fraud_stage, update_order_details
+from binance_inbound_events import InboundEventLog, frame_event_key, status_event_key
+from binance_msg_handler import record_order_status_writes
+
+# Each order sends one chat frame and then its completion notification, grouped the way
+# MerchantAccount.handle_message_by_type and _apply_order_status commit them.
+MESSAGES = int(os.environ.get('UOW_MESSAGES', 500))
+
+async def seed(conn):
+    await conn.executemany("INSERT INTO users (name, kyc_status, total_crypto_sold_lifetime) VALUES (?, 0, 0)",
+                           ((f"buyer {i}",) for i in range(MESSAGES)))
+    await conn.executemany("INSERT INTO orders (order_no, buyer_name, seller_name, trade_type, order_status, total_price, fiat_unit, asset, amount) "
+                           "VALUES (?, ?, 'seller', 'SELL', 1, 1000, 'MXN', 'USDT', 50)",
+                           ((str(i), f"buyer {i}") for i in range(MESSAGES)))
+    await conn.execute("INSERT INTO mxn_bank_accounts (account_bank_name, account_beneficiary, account_number, account_daily_limit, account_monthly_limit) "
+                       "VALUES ('bbva', 'beneficiary', 'acct 1', 90000, 2000000)")
+    await conn.commit()
+
+@asynccontextmanager
+async def no_unit_of_work(conn):
+    yield
+
+async def handle_frames(conn, events, i, group):
+    order_no, buyer_name = str(i), f"buyer {i}"
+    # Chat frame: its writes and its key.
+    async with group(conn):
+        await set_menu_presented(conn, order_no, True)
+        await update_buyer_bank(conn, order_no, 'bbva')
+        await update_order_details(conn, order_no, 'acct 1')
+        await update_anti_fraud_stage(conn, buyer_name, 3)
+        await update_kyc_status(conn, buyer_name, 1)
+        await events.record(conn, order_no, frame_event_key(f"text {i}"))
+    # Completion notification: the status, its bookkeeping and the status key, then the frame key on its own.
+    async with group(conn):
+        await update_order_status(conn, order_no, 4)
+        order_details = await get_order_details(conn, order_no)
+        await record_order_status_writes(conn, order_no, order_details, 4)
+        await events.record(conn, order_no, status_event_key(4))
+    await events.record(conn, order_no, frame_event_key(f"system {i}"))
+
+async def run_bench(label, group):
+    with tempfile.TemporaryDirectory() as tmp:
+        db_file = os.path.join(tmp, 'orders_data.db')
+        await migrate_database(db_file, ORDERS_DB_MIGRATIONS)
+        conn = await create_connection(db_file)
+        for pragma in DB_PRAGMAS:
+            await conn.execute(pragma)
+        await seed(conn)
+        events = InboundEventLog()
+        start = time.perf_counter()
+        for i in range(MESSAGES):
+            await handle_frames(conn, events, i, group)
+        elapsed = time.perf_counter() - start
+        async with conn.execute("SELECT COUNT(*) FROM mxn_deposits") as cursor:
+            deposits = (await cursor.fetchone())[0]
+        await conn.close()
+    assert deposits == MESSAGES, deposits
+    print(f"{label:<22} {2 * MESSAGES / elapsed:8.1f} frames/sec")
+
+async def main():
+    await run_bench("per-statement commits", no_unit_of_work)
+    await run_bench("as shipped", unit_of_work)
+
+if __name__ == "__main__":
+    asyncio.run(main())
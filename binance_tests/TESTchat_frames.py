@@ -0,0 +1,39 @@
+import json
+import random
+import timeit
+from binance_chat_frames import ChatFrameFilter
+from binance_models import Order
+from binance_order_cache import order_cache
+
+FRAMES = 100_000
+
+def make_frames():
+    order_cache.put('usd', Order(1, 'usd', 'buyer', 'seller', 'SELL', 1, 100.0, 'USD', 'USDT', 5.0, None, 0, None, None, None, None))
+    kinds = [
+        ({'type': 'text', 'orderNo': '1', 'uuid': 'u1', 'status': 'unread', 'content': 'hola', 'self': False}, None),
+        ({'type': 'text', 'orderNo': '1', 'uuid': 'u2', 'status': 'read', 'content': 'hola', 'self': False}, 'read_receipt'),
+        ({'type': 'text', 'orderNo': '1', 'uuid': 'self_1700000000000', 'status': 'unread', 'content': 'menu', 'self': False}, 'self_uuid'),
+        ({'type': 'text', 'orderNo': '1', 'uuid': 'u3', 'content': 'echo', 'self': True}, 'self'),
+        ({'type': 'auto_reply', 'orderNo': '1', 'uuid': 'u4', 'content': 'auto', 'self': False}, 'auto_reply'),
+        ({'type': 'text', 'orderNo': 'usd', 'uuid': 'u5', 'status': 'unread', 'content': 'hi', 'self': False}, 'ignored_fiat'),
+        ({'type': 'system', 'orderNo': 'usd', 'uuid': 'u6', 'status': 'read', 'content': '{"type": "buyer_payed"}', 'self': False}, None),
+        ({'type': 'image', 'orderNo': '2', 'uuid': 'u7', 'status': 'unread', 'imageUrl': 'https://example.invalid/a.jpg', 'self': False}, None),
+    ]
+    return [(json.dumps(frame), reason) for frame, reason in kinds]
+
+def main():
+    samples = make_frames()
+    frame_filter = ChatFrameFilter()
+    for message, expected in samples:
+        frame, reason = frame_filter.classify(message)
+        assert reason == expected, (message, reason)
+        assert (frame is None) == (expected is not None)
+    assert frame_filter.classify('not json') == (None, 'malformed')
+
+    frames = [random.choice(samples)[0] for _ in range(FRAMES)]
+    seconds = timeit.timeit(lambda: [frame_filter.accept(message) for message in frames], number=1)
+    print(f"Classified {FRAMES} frames in {seconds * 1000:.0f} ms ({seconds / FRAMES * 1e6:.2f} us/frame)")
+    print(frame_filter.stats())
+
+if __name__ == "__main__":
+    main()
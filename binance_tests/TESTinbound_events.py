@@ -0,0 +1,64 @@
+import os
+import asyncio
+import tempfile
+from binance_db_migrations import migrate_database, ORDERS_DB_MIGRATIONS
+from binance_inbound_events import BloomFilter, InboundEventLog, frame_event_key, status_event_key
+from common_utils_db import get_pool, close_pools
+
+async def main():
+    db_file = os.path.join(tempfile.mkdtemp(), 'events.db')
+    await migrate_database(db_file, ORDERS_DB_MIGRATIONS)
+    pool = get_pool(db_file)
+    events = InboundEventLog()
+
+    async with pool.connection() as conn:
+        assert not await events.seen(conn, '1', status_event_key(4))
+        assert await events.record(conn, '1', status_event_key(4))
+        assert await events.record(conn, '1', frame_event_key('a'))
+        # Redelivery in the same process: answered by the LRU.
+        assert await events.seen(conn, '1', status_event_key(4))
+    assert events.cache_hits == 1
+
+    # After a restart the LRU is empty; the table still turns the replay away.
+    restarted = InboundEventLog()
+    async with pool.connection() as conn:
+        assert await restarted.seen(conn, '1', status_event_key(4))
+        assert not await restarted.seen(conn, '1', status_event_key(5))
+        # Checking takes no write lock: nothing is left uncommitted.
+        assert not conn.in_transaction
+    assert restarted.cache_hits == 0
+
+    # Warmed from the table, new events are answered by the filter without a query.
+    warmed = InboundEventLog()
+    async with pool.connection() as conn:
+        await warmed.warm(conn)
+        assert await warmed.seen(conn, '1', frame_event_key('a'))
+        for i in range(1000):
+            assert not await warmed.seen(conn, '3', frame_event_key(i))
+    assert warmed.lookups < 1000 * 0.05, warmed.stats()
+
+    small = BloomFilter(capacity=1000)
+    for i in range(1000):
+        small.add(str(i))
+    assert all(str(i) in small for i in range(1000))
+    assert sum(str(i) in small for i in range(1000, 11000)) < 10000 * 0.03
+
+    # A rolled-back record leaves no row; discard() drops the cached key so a redelivery is handled.
+    try:
+        async with pool.transaction() as conn:
+            assert await events.record(conn, '2', status_event_key(4))
+            raise RuntimeError("handler failed")
+    except RuntimeError:
+        events.discard('2')
+    async with pool.connection() as conn:
+        assert not await events.seen(conn, '2', status_event_key(4))
+        assert await events.record(conn, '2', status_event_key(4))
+
+    async with pool.connection() as conn:
+        async with conn.execute("SELECT order_no, event_key FROM inbound_events ORDER BY order_no, event_key") as cursor:
+            print(await cursor.fetchall())
+    print(events.stats(), restarted.stats())
+    await close_pools()
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -28,6 +28,7 @@ async def test_order_insertion():
     }
 
     await binance_db.insert_or_update_order(conn, order_details)
+    await conn.commit()
 
     # 3. Fetch the order from the database to verify its presence
     order_data = await binance_db_get.get_order_details(conn, order_details['data']['orderNumber'])
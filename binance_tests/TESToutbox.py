@@ -0,0 +1,47 @@
+import time
+import asyncio
+import binance_messages
+from binance_outbox import outbound_messages
+
+GAP = 0.2
+
+class FakeConnectionManager:
+    def __init__(self):
+        self.sent = []  # (order_no, text, seconds since start)
+        self.started = time.monotonic()
+
+    async def send_text_message(self, text, order_no):
+        outbound_messages.enqueue(self, order_no, text)
+
+    async def write_text_message(self, text, order_no):
+        self.sent.append((order_no, text, time.monotonic() - self.started))
+        return True
+
+async def main():
+    binance_messages.MESSAGE_INTERVAL = GAP
+    connection_manager = FakeConnectionManager()
+
+    started = time.monotonic()
+    await binance_messages.send_messages(connection_manager, 'A', ['a1', 'a2', 'a3'])
+    await connection_manager.send_text_message('a4', 'A')
+    await binance_messages.send_messages(connection_manager, 'B', ['b1', 'b2'])
+    returned_after = time.monotonic() - started
+    print(f"Callers returned after {returned_after * 1000:.1f} ms; backlog {outbound_messages.backlog()}")
+    assert returned_after < GAP
+
+    await outbound_messages.join()
+    for order_no, text, at in connection_manager.sent:
+        print(f"{at:5.2f}s {order_no} {text}")
+    by_order = {}
+    for order_no, text, at in connection_manager.sent:
+        by_order.setdefault(order_no, []).append((text, at))
+    assert [text for text, _ in by_order['A']] == ['a1', 'a2', 'a3', 'a4']
+    assert [text for text, _ in by_order['B']] == ['b1', 'b2']
+    gaps = [later - earlier for (_, earlier), (_, later) in zip(by_order['A'], by_order['A'][1:])]
+    assert all(gap >= GAP * 0.9 for gap in gaps), gaps
+    # Orders are paced independently.
+    assert by_order['B'][0][1] < GAP
+    print(outbound_messages.stats())
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,100 @@
+import datetime
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+from binance_db import SQL_CREATE_USERS_TABLE, SQL_CREATE_ORDERS_TABLE, SQL_CREATE_ORDER_BANK_IDENTIFIERS_TABLE, SQL_CREATE_TRANSACTIONS_TABLE, SQL_CREATE_MERCHANTS_TABLE
+from binance_bank_deposit_db import SQL_CREATE_MXN_DEPOSITS_TABLE, SQL_CREATE_MXN_BANK_ACCOUNTS_TABLE
+from binance_blacklist import SQL_CREATE_P2P_BLACKLIST_TABLE
+from binance_bank_deposit import FIND_SUITABLE_ACCOUNT_SQL, DEPOSIT_LIMIT_SQL, deposit_period_bounds
+from binance_db_get import SQL_SELECT_ORDER
+from binance_db_indexes import ORDERS_DB_INDEXES, ORDER_BANK_IDENTIFIERS_UNIQUE_INDEX
+
+ROWS = int(os.environ.get('QUERY_PLAN_ROWS', 1_000_000))
+BANK_ACCOUNTS = 12
+# Tables small enough that a full scan is the right plan.
+SMALL_TABLES = {'mxn_bank_accounts', 'a'}
+
+now = datetime.datetime.now(datetime.timezone.utc)
+day_start, day_end, month_start, month_end = deposit_period_bounds(now)
+
+HOT_QUERIES = {
+    'get_order_details': (SQL_SELECT_ORDER, ('42',)),
+    'order_exists': ("SELECT id FROM orders WHERE order_no = ?", ('42',)),
+    'get_kyc_status': ("SELECT kyc_status FROM users WHERE name=?", ('buyer 42',)),
+    'is_blacklisted': ("SELECT id FROM P2PBlacklist WHERE name = ?", ('buyer 42',)),
+    'has_specific_bank_identifiers': (
+        "SELECT COUNT(*) FROM order_bank_identifiers WHERE order_no = ? AND bank_identifier IN (?,?)",
+        ('42', 'OXXO', 'SkrillMoneybookers')),
+    'calculate_crypto_sold_30d': (
+        "SELECT SUM(amount) FROM orders WHERE buyer_name = ? AND order_status = 4 AND order_date >= datetime('now', '-30 day')",
+        ('buyer 42',)),
+    'check_deposit_limit': (DEPOSIT_LIMIT_SQL, ('acct 1', 'buyer 42', now.year, now.month)),
+    'find_suitable_account': (
+        FIND_SUITABLE_ACCOUNT_SQL.format(buyer_bank_condition="AND LOWER(a.account_bank_name) = ?"),
+        ('buyer 42', day_start, day_end, month_start, month_end, 1000, 1000, 'bbva')),
+    'sum_recent_deposits': (
+        "SELECT SUM(amount_deposited) FROM mxn_deposits WHERE account_number = ? AND timestamp > ?",
+        ('acct 1', (now - datetime.timedelta(days=1)).strftime('%Y-%m-%d %H:%M:%S'))),
+}
+
+def seed(conn):
+    for sql in (SQL_CREATE_MERCHANTS_TABLE, SQL_CREATE_USERS_TABLE, SQL_CREATE_TRANSACTIONS_TABLE, SQL_CREATE_ORDERS_TABLE,
+                SQL_CREATE_ORDER_BANK_IDENTIFIERS_TABLE, SQL_CREATE_MXN_DEPOSITS_TABLE, SQL_CREATE_MXN_BANK_ACCOUNTS_TABLE,
+                SQL_CREATE_P2P_BLACKLIST_TABLE):
+        conn.execute(sql)
+    start = now - datetime.timedelta(days=730)
+    conn.executemany("INSERT INTO users (name, kyc_status, total_crypto_sold_lifetime) VALUES (?, 1, 0)",
+                     ((f"buyer {i}",) for i in range(ROWS)))
+    conn.executemany("INSERT INTO P2PBlacklist (name, order_no, country) VALUES (?, ?, 'US')",
+                     ((f"buyer {i}", str(i)) for i in range(0, ROWS, 7)))
+    conn.executemany(
+        "INSERT INTO orders (order_no, buyer_name, seller_name, trade_type, order_status, total_price, fiat_unit, asset, amount, order_date) "
+        "VALUES (?, ?, 'seller', 'SELL', ?, 1000, 'MXN', 'USDT', 50, ?)",
+        ((str(i), f"buyer {i % (ROWS // 10 or 1)}", random.randint(1, 9), start + datetime.timedelta(minutes=i)) for i in range(ROWS)))
+    conn.executemany("INSERT INTO order_bank_identifiers (order_no, bank_identifier) VALUES (?, ?)",
+                     ((str(i), random.choice(['BBVABank', 'OXXO', 'BANK'])) for i in range(ROWS)))
+    conn.executemany("INSERT INTO mxn_bank_accounts (account_bank_name, account_beneficiary, account_number, account_daily_limit, account_monthly_limit) "
+                     "VALUES (?, 'beneficiary', ?, 90000, 2000000)",
+                     ((random.choice(['bbva', 'nvio', 'stp']), f"acct {i}") for i in range(BANK_ACCOUNTS)))
+
+    def deposits():
+        for i in range(ROWS):
+            ts = start + datetime.timedelta(seconds=i * 60)
+            yield (ts, f"acct {i % BANK_ACCOUNTS}", 1000.0, f"buyer {i % (ROWS // 10 or 1)}", ts.year, ts.month)
+    conn.executemany("INSERT INTO mxn_deposits (timestamp, account_number, amount_deposited, deposit_from, year, month) VALUES (?, ?, ?, ?, ?, ?)",
+                     deposits())
+    for sql in ORDERS_DB_INDEXES + [ORDER_BANK_IDENTIFIERS_UNIQUE_INDEX, "DROP INDEX idx_order_bank_identifiers_order_no"]:
+        conn.execute(sql)
+    conn.execute("ANALYZE")
+    conn.commit()
+
+def full_scans(conn, sql, params):
+    scans = []
+    for _, _, _, detail in conn.execute(f"EXPLAIN QUERY PLAN {sql}", params):
+        if detail.startswith('SCAN '):
+            target = detail.split()[1]
+            if target not in SMALL_TABLES and not target.startswith('('):
+                scans.append(detail)
+    return scans
+
+def main():
+    with tempfile.TemporaryDirectory() as tmp:
+        conn = sqlite3.connect(os.path.join(tmp, 'orders_data.db'))
+        print(f"Seeding {ROWS} rows per table...")
+        seed(conn)
+        failures = 0
+        for name, (sql, params) in HOT_QUERIES.items():
+            scans = full_scans(conn, sql, params)
+            status = 'FAIL' if scans else 'ok'
+            failures += bool(scans)
+            print(f"{status:<4} {name}{': ' + '; '.join(scans) if scans else ''}")
+        conn.close()
+    if failures:
+        print(f"{failures} hot queries do full table scans")
+        sys.exit(1)
+    print("No hot query does a full table scan")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,53 @@
+import os
+import random
+import asyncio
+import logging
+import tempfile
+from binance_book import BookSnapshot
+from binance_book_recorder import BookRecorder, load_recording
+from binance_models import Ad, BookEntry
+from binance_repricing_sim import replay, print_report
+
+SNAPSHOTS = 5000
+BOOK_SIZE = 40
+KEY = ('USDT', 'MXN', 5000, ('BANK',))
+OWN_ADS = [Ad('1', 3, 'USDT', None, 103.0, None, 'account', 0, 'MXN', 5000, ['BANK'], 'Group'),
+           Ad('2', 1, 'USDT', None, 104.5, None, 'account', 0, 'MXN', 5000, ['BANK'], 'Group')]
+BASE_PRICE = 17.5
+
+def make_snapshot(drift):
+    ads = [BookEntry(str(100 + i), round(BASE_PRICE * (1.02 + i * 0.001 + drift + random.uniform(0, 0.002)), 2),
+                     random.choice([1000, 8000, 50000]))
+           for i in range(BOOK_SIZE)]
+    for own in OWN_ADS:
+        ads.append(BookEntry(own.advNo, round(BASE_PRICE * own.floating_ratio / 100, 2), 50000))
+    ads.sort(key=lambda entry: entry.price)
+    return BookSnapshot(ads, pages=2)
+
+def main():
+    logging.getLogger('binance_update_ads').setLevel(logging.WARNING)
+    path = os.path.join(tempfile.mkdtemp(), 'books.jsonl.gz')
+    recorder = BookRecorder(path)
+    drift = 0.0
+    for _ in range(SNAPSHOTS):
+        drift += random.uniform(-0.0005, 0.0005)
+        recorder.record(KEY, make_snapshot(drift), OWN_ADS)
+    recorder.close()
+    print(f"Recording: {os.path.getsize(path) / SNAPSHOTS:.0f} bytes per {BOOK_SIZE + len(OWN_ADS)}-ad snapshot")
+
+    snapshots = list(load_recording(path))
+    sim_ads, stats = asyncio.run(replay(snapshots))
+    print_report(sim_ads, stats)
+    assert stats['snapshots'] == SNAPSHOTS
+    assert all(len(sim_ad.ranks) == SNAPSHOTS for sim_ad in sim_ads.values())
+
+    # A wider undercut should buy a better rank for less margin.
+    wider, wider_stats = asyncio.run(replay(snapshots, RATIO_ADJUSTMENT=0.2))
+    print_report(wider, wider_stats)
+    for advNo, sim_ad in sim_ads.items():
+        default, undercut = sim_ad.summary(), wider[advNo].summary()
+        assert undercut['mean_rank'] <= default['mean_rank'], (advNo, default, undercut)
+        assert undercut['mean_margin'] < default['mean_margin'], (advNo, default, undercut)
+
+if __name__ == "__main__":
+    main()
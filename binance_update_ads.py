@@ -1,9 +1,18 @@
 import asyncio
+import os
+import time
 import traceback
 import logging
-from ads_database import update_ad_in_database, fetch_all_ads_from_database
+from ads_database import update_ad_in_database, fetch_all_ads_from_database, ads_repository
 from credentials import credentials_dict
 from binance_api import BinanceAPI
+from binance_client import TokenBucket
+from binance_price_listener import BinancePriceListener
+from binance_book import fetch_book_snapshot
+from binance_ad_updates import ad_update_queue
+from binance_book_recorder import BookRecorder
+from binance_models import BookEntry
+from common_utils import ServerTimestampCache
 
 logger = logging.getLogger(__name__)
 
@@ -12,18 +21,22 @@ MIN_RATIO = 101.63
 MAX_RATIO = 110
 RATIO_ADJUSTMENT = 0.04
 DIFF_THRESHOLD = 0.09
-DELAY_BETWEEN_ASSET_TYPES = 2
 DELAY_BETWEEN_MAIN_LOOPS = 180
 AMOUNT_THRESHOLD = 5000
+MAX_CONCURRENT_SEARCHES = 8
+MIN_POLL_INTERVAL = 10  # seconds, for books whose competitors moved on the last poll
+MAX_POLL_INTERVAL = DELAY_BETWEEN_MAIN_LOOPS  # seconds, for books that have been quiet
+POLL_BACKOFF = 2
+REPRICING_WEIGHT_BUDGET = 240  # search weight per minute the scheduler may spend
+SEARCH_WEIGHT = 1
+SPOT_MOVE_THRESHOLD = 0.002  # reprice the asset's books when spot moves 0.2%
+SPOT_SYMBOLS = {'BTC': 'BTCUSDT', 'ETH': 'ETHUSDT', 'BNB': 'BNBUSDT'}
+# Set to a .jsonl.gz path to record every polled book for binance_repricing_sim.
+BOOK_RECORDING_PATH = os.getenv('BOOK_RECORDING_PATH')
 
-def filter_ads(ads_data, base_price, own_ads):
-    own_adv_nos = [ad['advNo'] for ad in own_ads]
-    logger.debug(f'own ad numbers: {own_adv_nos}')
-    return [ad for ad in ads_data 
-            if ad['adv']['advNo'] not in own_adv_nos 
-            and float(ad['adv']['price']) >= base_price * PRICE_THRESHOLD
-            and float(ad['adv']['dynamicMaxSingleTransAmount']) >= AMOUNT_THRESHOLD]
-
+def filter_ads(book, base_price):
+    """Rank-ordered positions in the ColumnarBook of the competitor ads we price against."""
+    return book.competitors(base_price * PRICE_THRESHOLD, AMOUNT_THRESHOLD)
 
 def compute_base_price(price: float, floating_ratio: float) -> float:
     return round(price / (floating_ratio / 100), 2)
@@ -36,51 +49,49 @@ def check_if_ads_avail(ads_list, adjusted_target_spot):
         else:
             return adjusted_target_spot
 
-async def analyze_and_update_ads(ad, api_instance, ads_data, all_ads):
-    advNo = ad['advNo']
-    target_spot = ad['target_spot']
-    asset_type = ad['asset_type']
-    current_priceFloatingRatio = float(ad['floating_ratio'])
-    surplusAmount = ad['surplused_amount']
-    fiat = ad['fiat']
-    transAmount = ad['transAmount']
+async def analyze_and_update_ads(ad, api_instance, book, update_queue=None):
+    advNo = ad.advNo
+    target_spot = ad.target_spot
+    asset_type = ad.asset_type
+    current_priceFloatingRatio = ad.floating_ratio
+    fiat = ad.fiat
+    transAmount = ad.transAmount
 
     try:
-        our_ad_data = next((item for item in ads_data if item['adv']['advNo'] == advNo), None)
-        logger.debug(f'Ads_data: {ads_data}')
+        our_position = book.position(advNo)
 
-        if not our_ad_data:
-            our_ad_data = await api_instance.get_ad_detail(advNo)
-            if our_ad_data is None or 'data' not in our_ad_data:
+        if our_position is None:
+            our_ad_detail = await api_instance.fetch_ad_detail(advNo)
+            if our_ad_detail is None:
                 logger.error(f"Failed to get details for ad number {advNo}")
                 return
             await update_ad_in_database(
                 target_spot=target_spot,
                 advNo=advNo,
-                asset_type=our_ad_data['data']['asset'],
-                floating_ratio=our_ad_data['data']['priceFloatingRatio'],
-                price=our_ad_data['data']['price'],
-                surplusAmount=our_ad_data['data']['surplusAmount'],
-                account=ad['account'],
+                asset_type=our_ad_detail.asset_type,
+                floating_ratio=our_ad_detail.floating_ratio,
+                price=our_ad_detail.price,
+                surplusAmount=our_ad_detail.surplused_amount,
+                account=ad.account,
                 fiat=fiat,
                 transAmount=transAmount
             )
-            our_current_price = float(our_ad_data['data']['price'])
+            our_current_price = our_ad_detail.price
         else:
-            our_current_price = float(our_ad_data['adv']['price'])
+            our_current_price = float(book.prices[our_position])
 
         base_price = compute_base_price(our_current_price, current_priceFloatingRatio)
         logger.debug(f"Base Price: {base_price}")
-        filtered_ads = filter_ads(ads_data, base_price, all_ads)
+        filtered_ads = filter_ads(book, base_price)
         adjusted_target_spot = check_if_ads_avail(filtered_ads, target_spot)
 
-        if not filtered_ads:
+        if not len(filtered_ads):
             logger.debug(f"No competitor ads found for {advNo}")
             return
 
-        competitor_ad = filtered_ads[adjusted_target_spot - 1]
-        logger.info(f'Competitor ad: {competitor_ad}')
-        competitor_price = float(competitor_ad['adv']['price'])
+        competitor_position = filtered_ads[adjusted_target_spot - 1]
+        logger.info(f'Competitor ad: {book.ads[competitor_position]}')
+        competitor_price = float(book.prices[competitor_position])
         competitor_ratio = (competitor_price / base_price) * 100
 
         if our_current_price >= competitor_price:
@@ -98,64 +109,178 @@ async def analyze_and_update_ads(ad, api_instance, ads_data, all_ads):
             logger.debug(f"Ratio unchanged")
             return
         else:
-            await api_instance.update_ad(advNo, new_ratio)
-            await update_ad_in_database(target_spot, advNo, asset_type, new_ratio, our_current_price, surplusAmount, ad['account'], fiat, transAmount)
+            # Sent on the queue's next flush; the ads table is updated once Binance confirms it.
+            (update_queue or ad_update_queue).submit(ad, api_instance, new_ratio, our_current_price)
             logger.debug(f"Ad: {asset_type} - start price: {our_current_price}, ratio: {current_priceFloatingRatio}. Competitor ad - spot: {adjusted_target_spot}, price: {competitor_price}, base: {base_price}, ratio: {competitor_ratio}")
-            await asyncio.sleep(2)
 
     except Exception as e:
         traceback.print_exc()
         
-async def process_ads(ads_group, api_instances, all_ads):
-    if not ads_group:
-        return
-    for ad in ads_group:
-        # Directly use the account of the current ad to get the API instance
-        api_instance = api_instances[ad['account']]
-        # Convert payTypes to a list if not None, else default to an empty list
-        payTypes_list = ad['payTypes'] if ad['payTypes'] is not None else []
-        # Perform the fetch_ads_search call for the current ad
-        ads_data = await api_instance.fetch_ads_search(ad['asset_type'], ad['fiat'], ad['transAmount'], payTypes_list)
-        # Validate ads_data
-        if ads_data is None or ads_data.get('code') != '000000' or 'data' not in ads_data:
-            logger.error(f"Failed to fetch ads data for asset_type {ad['asset_type']}, fiat {ad['fiat']}, transAmount {ad['transAmount']}, and payTypes {payTypes_list}.")
-            continue
-        current_ads_data = ads_data['data']
-        if not isinstance(current_ads_data, list) or not current_ads_data:
-            logger.debug(f"No valid ads data for asset_type {ad['asset_type']}, fiat {ad['fiat']}, transAmount {ad['transAmount']}, and payTypes {payTypes_list}.")
-            continue
-        # Process the current ad with the fetched ads_data
-        await analyze_and_update_ads(ad, api_instance, current_ads_data, all_ads)
-        await asyncio.sleep(1)
-
-async def main_loop(api_instances):
-    all_ads = await fetch_all_ads_from_database()
-    logger.debug(f"All ads: {len(all_ads)}")
+def search_key(ad):
+    return (ad.asset_type, ad.fiat, ad.transAmount, tuple(sorted(ad.payTypes or [])))
+
+def is_competitor(entry, own_adv_nos):
+    return entry.adv_no not in own_adv_nos and entry.max_amount >= AMOUNT_THRESHOLD
+
+async def fetch_ads_book(api_instance, key, semaphore, own_adv_nos=frozenset(), needed=1, budget=None):
+    """Snapshot the book for key, paging until it holds `needed` competitors; pages past the first are charged to budget."""
+    asset_type, fiat, transAmount, payTypes = key
+
+    async def fetch_page(page):
+        if page > 1 and budget is not None:
+            await budget.acquire(SEARCH_WEIGHT)
+        async with semaphore:
+            # Uncached: a cached page would show no diff and back the book off without repricing.
+            ads_data = await api_instance.fetch_ads_search(asset_type, fiat, transAmount, list(payTypes), page=page, cached=False)
+        if ads_data is None or ads_data.get('code') != '000000' or not isinstance(ads_data.get('data'), list):
+            logger.error(f"Failed to fetch ads data for asset_type {asset_type}, fiat {fiat}, transAmount {transAmount}, payTypes {list(payTypes)}, page {page}.")
+            return None
+        return [BookEntry.from_api(item) for item in ads_data['data']]
 
-    # Group ads by Group value
-    grouped_ads = {}
+    snapshot = await fetch_book_snapshot(fetch_page, needed, lambda ad: is_competitor(ad, own_adv_nos))
+    if snapshot is not None and not snapshot.ads:
+        logger.debug(f"No valid ads data for asset_type {asset_type}, fiat {fiat}, transAmount {transAmount}, and payTypes {list(payTypes)}.")
+    return snapshot
+
+def group_by_book(all_ads):
+    ads_by_book = {}
     for ad in all_ads:
-        group_key = ad['Group']
-        grouped_ads.setdefault(group_key, []).append(ad)
+        ads_by_book.setdefault(search_key(ad), []).append(ad)
+    return ads_by_book
+
+class BookSchedule:
+    def __init__(self, due):
+        self.interval = MIN_POLL_INTERVAL
+        self.due = due
+        self.snapshot = None
+        self.last_diff = None
+
+class RepricingScheduler:
+    """Polls each ad book on its own adaptive interval instead of sweeping everything on a fixed cadence.
+
+    A book that changed since its last snapshot is repriced and polled again after
+    MIN_POLL_INTERVAL; an unchanged book is not repriced and its interval doubles up
+    to MAX_POLL_INTERVAL. trigger() makes books due immediately, and every search
+    page is paid for from the weight budget.
+    """
+
+    def __init__(self, api_instances, weight_budget=REPRICING_WEIGHT_BUDGET, recorder=None):
+        self.api_instances = api_instances
+        self.recorder = recorder
+        self.books = {}
+        self.budget = TokenBucket(weight_budget, weight_budget / 60)
+        self._triggered_assets = set()
+        self._wakeup = asyncio.Event()
 
-    # Process each group of ads
-    for group_key, ads_group in grouped_ads.items():
-        await process_ads(ads_group, api_instances, all_ads)
-        await asyncio.sleep(DELAY_BETWEEN_ASSET_TYPES)
+    def trigger(self, asset=None):
+        """Poll the books for asset (every book when None) as soon as possible."""
+        self._triggered_assets.add(asset)
+        self._wakeup.set()
 
-    # Closing of API instance sessions can be handled outside if they need to be reused
+    def _due_books(self, all_ads, now):
+        keys = {search_key(ad) for ad in all_ads}
+        self.books = {key: self.books.get(key) or BookSchedule(now) for key in keys}
+        triggered, self._triggered_assets = self._triggered_assets, set()
+        for key, book in self.books.items():
+            if None in triggered or key[0] in triggered:
+                book.due = min(book.due, now)
+        due = sorted((key for key, book in self.books.items() if book.due <= now), key=lambda key: self.books[key].due)
+        affordable = []
+        for key in due:
+            if not self.budget.try_acquire(SEARCH_WEIGHT):
+                logger.debug(f"Weight budget exhausted, deferring {len(due) - len(affordable)} ad books")
+                break
+            affordable.append(key)
+        return affordable
+
+    def _reschedule(self, key, snapshot, now):
+        """Record the new snapshot and return its diff against the previous one (None if the fetch failed)."""
+        book = self.books[key]
+        diff = None
+        if snapshot is not None:
+            diff = snapshot.diff(book.snapshot)
+            book.interval = MIN_POLL_INTERVAL if diff else min(MAX_POLL_INTERVAL, book.interval * POLL_BACKOFF)
+            book.snapshot = snapshot
+            book.last_diff = diff
+        book.due = now + book.interval
+        return diff
+
+    def _next_wait(self):
+        if not self.books:
+            return MAX_POLL_INTERVAL
+        wait = min(book.due for book in self.books.values()) - time.monotonic()
+        # Books still due were deferred for budget: wait for the next search to be affordable.
+        return wait if wait > 0 else SEARCH_WEIGHT / self.budget.refill_per_second
+
+    async def poll_once(self):
+        self._wakeup.clear()
+        all_ads = await fetch_all_ads_from_database()
+        due = self._due_books(all_ads, time.monotonic())
+        if due:
+            own_adv_nos = frozenset(ad.advNo for ad in all_ads)
+            ads_by_book = group_by_book(all_ads)
+            semaphore = asyncio.Semaphore(MAX_CONCURRENT_SEARCHES)
+            snapshots = await asyncio.gather(*(
+                fetch_ads_book(self.api_instances[ads_by_book[key][0].account], key, semaphore, own_adv_nos,
+                               max(ad.target_spot for ad in ads_by_book[key]), self.budget)
+                for key in due))
+            tasks = []
+            for key, snapshot in zip(due, snapshots):
+                if self.recorder is not None and snapshot is not None:
+                    self.recorder.record(key, snapshot, ads_by_book[key])
+                diff = self._reschedule(key, snapshot, time.monotonic())
+                if not diff or not snapshot.ads:
+                    continue
+                logger.debug(f"Book {key} changed: {diff}")
+                book = snapshot.columns(own_adv_nos)
+                tasks.extend(analyze_and_update_ads(ad, self.api_instances[ad.account], book) for ad in ads_by_book[key])
+            await asyncio.gather(*tasks)
+            logger.debug(f"Polled {len(due)} of {len(self.books)} ad books")
+        return self._next_wait()
+
+    async def run(self):
+        while True:
+            try:
+                wait = await self.poll_once()
+            except Exception:
+                logger.exception("Repricing poll failed")
+                wait = MIN_POLL_INTERVAL
+            try:
+                await asyncio.wait_for(self._wakeup.wait(), timeout=wait)
+            except asyncio.TimeoutError:
+                pass
+
+def start_price_listeners(scheduler, assets):
+    """Reprice an asset's books as soon as its spot price moves, rather than at the next scheduled poll."""
+    tasks = []
+    for asset in sorted(set(assets) & SPOT_SYMBOLS.keys()):
+        listener = BinancePriceListener(SPOT_SYMBOLS[asset], move_threshold=SPOT_MOVE_THRESHOLD)
+        listener.add_move_callback(lambda price, asset=asset: scheduler.trigger(asset))
+        tasks.append(asyncio.create_task(listener.start()))
+    return tasks
 
 async def start_update_ads():
+    await ServerTimestampCache.start()
+    all_ads = await fetch_all_ads_from_database()
     # Initialize API instances once
-    api_instances = {account: BinanceAPI(credentials_dict[account]['KEY'], credentials_dict[account]['SECRET']) for account in set(ad['account'] for ad in await fetch_all_ads_from_database())}
-
-    while True: 
-        await main_loop(api_instances)
-        await asyncio.sleep(DELAY_BETWEEN_MAIN_LOOPS)
+    api_instances = {account: BinanceAPI(credentials_dict[account]['KEY'], credentials_dict[account]['SECRET']) for account in set(ad.account for ad in all_ads)}
+    recorder = BookRecorder(BOOK_RECORDING_PATH) if BOOK_RECORDING_PATH else None
+    scheduler = RepricingScheduler(api_instances, recorder=recorder)
+    background_tasks = start_price_listeners(scheduler, (ad.asset_type for ad in all_ads))
+    background_tasks.append(asyncio.create_task(ad_update_queue.run()))
+    try:
+        await scheduler.run()
+    finally:
+        for task in background_tasks:
+            task.cancel()
+        if recorder is not None:
+            recorder.close()
 
-    # Optionally close each API instance session after exiting the loop
-    for api_instance in api_instances.values():
-        await api_instance.close_session()
+async def main():
+    try:
+        await start_update_ads()
+    finally:
+        await ads_repository.close()
 
 if __name__ == "__main__":
-    asyncio.get_event_loop().run_until_complete(start_update_ads())
\ No newline at end of file
+    asyncio.get_event_loop().run_until_complete(main())
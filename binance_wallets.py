@@ -1,9 +1,7 @@
 from credentials import credentials_dict
-from common_utils import get_server_timestamp
 from asset_balances import update_balance, get_balance
-import hmac
-import hashlib
-import aiohttp
+from binance_client import get_client
+from binance_endpoints import USER_ASSET, FUNDING_ASSET, SPOT_ORDER
 import asyncio
 import platform
 
@@ -21,43 +19,19 @@ class BinanceWallets:
         self.credentials_dict = credentials_dict
 
 
-    def generate_signature(self, api_secret, payload):
-        signature = hmac.new(api_secret.encode('utf-8'), payload.encode('utf-8'), hashlib.sha256).hexdigest()
-        return signature
-
     async def get_user_assets(self, api_key, api_secret, account):
         try:
-            timestamp = await get_server_timestamp()
-            query_string = f"timestamp={timestamp}"
-
-            signature = self.generate_signature(api_secret, query_string)
-            url = f"https://api.binance.com/sapi/v3/asset/getUserAsset?{query_string}&signature={signature}"
-
-            headers = {"X-MBX-APIKEY": api_key}
-
-            async with aiohttp.ClientSession() as session:
-                async with session.post(url, headers=headers) as response:
-                    if response.status == 200:
-                        assets_data = await response.json()
-                        self.update_balances(assets_data, account, is_funding=False)
+            assets_data = await get_client(api_key, api_secret).request("POST", USER_ASSET, weight=5)
+            if assets_data is not None:
+                self.update_balances(assets_data, account, is_funding=False)
         except Exception as e:
             logger.error(f"An exception occurred in get_user_assets: {e}")
 
     async def get_funding_assets(self, api_key, api_secret, account):
         try:
-            timestamp = await get_server_timestamp()
-            query_string = f"timestamp={timestamp}"
-
-            signature = self.generate_signature(api_secret, query_string)
-            url = f"https://api.binance.com/sapi/v1/asset/get-funding-asset?{query_string}&signature={signature}"
-
-            headers = {"X-MBX-APIKEY": api_key}
-
-            async with aiohttp.ClientSession() as session:
-                async with session.post(url, headers=headers) as response:
-                    if response.status == 200:
-                        funding_data = await response.json()
-                        self.update_balances(funding_data, account, is_funding=True)
+            funding_data = await get_client(api_key, api_secret).request("POST", FUNDING_ASSET)
+            if funding_data is not None:
+                self.update_balances(funding_data, account, is_funding=True)
         except Exception as e:
             logger.error(f"An exception occurred in get_funding_assets: {e}")
 
@@ -110,24 +84,19 @@ class BinanceWallets:
         return max_account, most_usd_asset
     async def place_order(self, api_key, api_secret, symbol, side, order_type, quantity=None, price=None, timeInForce=None, quoteOrderQty=None):
         try:
-            timestamp = await get_server_timestamp()
-            query_string = f"symbol={symbol}&side={side}&type={order_type}&timestamp={timestamp}"
+            params = {"symbol": symbol, "side": side, "type": order_type}
             if quantity:
-                query_string += f"&quantity={quantity}"
+                params["quantity"] = quantity
             if price:
-                query_string += f"&price={price}"
+                params["price"] = price
             if timeInForce:
-                query_string += f"&timeInForce={timeInForce}"
-            signature = self.generate_signature(api_secret, query_string)
-            url = f"https://api.binance.com/api/v3/order?{query_string}&signature={signature}"
-            headers = {"X-MBX-APIKEY": api_key}
-            async with aiohttp.ClientSession() as session:
-                async with session.post(url, headers=headers) as response:
-                    if response.status == 200:
-                        order_data = await response.json()
-                        logger.info(f"Order successfully placed: {order_data}")
-                    else:
-                        logger.error(f"Failed to place order: {await response.text()}")
+                params["timeInForce"] = timeInForce
+            # Orders are not idempotent, so never retry them blindly.
+            order_data = await get_client(api_key, api_secret).request("POST", SPOT_ORDER, params=params, max_retries=1)
+            if order_data is not None:
+                logger.info(f"Order successfully placed: {order_data}")
+            else:
+                logger.error(f"Failed to place order: {params}")
         except Exception as e:
             logger.warning(f"An exception occurred in place_order: {e}")
     async def save_balances_to_db(self, account):
@@ -1,37 +1,14 @@
 import asyncio
-import aiohttp
-from urllib.parse import urlencode
 import websockets
 import logging
-from common_utils import get_server_timestamp, hashing
 from binance_endpoints import GET_CHAT_CREDENTIALS
 from credentials import credentials_dict
-from binance_c2c import on_message
+from binance_c2c import on_message, send_http_request
 from binance_merchants import fetch_merchant_credentials
 
 logger = logging.getLogger(__name__)
 async_sessions = {}
 
-async def send_http_request(method, url, api_key, secret_key, params=None, body=None):
-    params = params or {}
-    params['timestamp'] = await get_server_timestamp()
-    query_string = urlencode(params)
-    signature = hashing(query_string, secret_key)
-    final_url = f"{url}?{query_string}&signature={signature}"
-    headers = {
-        "Content-Type": "application/json;charset=utf-8",
-        "X-MBX-APIKEY": api_key,
-        "clientType": "WEB"
-    }
-
-    async with aiohttp.ClientSession() as session:
-        async with session.request(method, final_url, json=body, headers=headers) as response:
-            response_data = await response.json()
-            if response.status != 200 or 'data' not in response_data:
-                logger.error(f"Error {response.status} from API: {response_data}")
-                return None
-            return response_data['data']
-
 async def get_websocket_url(api_key, secret_key):
     response_data = await send_http_request("GET", GET_CHAT_CREDENTIALS, api_key, secret_key)
     if response_data and 'chatWssUrl' in response_data and 'listenKey' in response_data:
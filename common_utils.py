@@ -1,7 +1,7 @@
 import hashlib
 import hmac
 import time
-import aiohttp
+from common_utils_http import get_http_session
 import asyncio
 from binance_endpoints import TIME_ENDPOINT_V1, TIME_ENDPOINT_V3
 import logging
@@ -11,55 +11,121 @@ def hashing(query_string, secret):
     return hmac.new(secret.encode('utf-8'), query_string.encode('utf-8'), hashlib.sha256).hexdigest()
 
 class ServerTimestampCache:
-    offset = None
+    """Binance server clock kept as a monotonic anchor so reading it never awaits.
+
+    anchor is (server_ms, monotonic_s, drift) and is replaced as a whole tuple, so readers
+    never see a half-updated clock.
+    """
+    anchor = None
     is_initialized = False
-    is_maintenance_task_started = False
+    is_started = False
+    _first_sync = None  # task of the sync start() callers are waiting on
+    _maintainer = None
     sync_interval = 1800  # Sync every 30 minutes
+    samples_per_sync = 3
+    max_drift = 0.0005  # Clamp drift estimates to 500 ppm
+
+    @classmethod
+    def now(cls, monotonic_now=None):
+        anchor = cls.anchor
+        if anchor is None:
+            return None
+        server_ms, anchor_monotonic, drift = anchor
+        if monotonic_now is None:
+            monotonic_now = time.monotonic()
+        return server_ms + (monotonic_now - anchor_monotonic) * 1000 * (1 + drift)
+
+    @classmethod
+    async def sample_server_time(cls, session, endpoint):
+        sent = time.monotonic()
+        async with session.get(endpoint) as response:
+            if response.status != 200:
+                return None
+            data = await response.json()
+        received = time.monotonic()
+        rtt = received - sent
+        # Assume the server stamped the response halfway through the round trip.
+        return data['serverTime'] + rtt * 500, received, rtt
 
     @classmethod
     async def fetch_server_time(cls):
-        async with aiohttp.ClientSession() as session:
-            endpoints = [TIME_ENDPOINT_V3, TIME_ENDPOINT_V1]
-            for attempt in range(3):
-                for endpoint in endpoints:
-                    try:
-                        async with session.get(endpoint) as response:
-                            if response.status == 200:
-                                data = await response.json()
-                                server_time = data['serverTime']
-                                cls.offset = server_time - int(time.time() * 1000)
-                                cls.is_initialized = True
-                                logger.info(f"Updated server timestamp: {server_time}")
-                                return
-                    except Exception as e:
-                        logger.error(f"Attempt {attempt + 1}: Failed to fetch server time from {endpoint}: {e}")
-                        await asyncio.sleep(1)  # Pause for 1 second before retrying
+        session = get_http_session()
+        endpoints = [TIME_ENDPOINT_V3, TIME_ENDPOINT_V1]
+        for attempt in range(3):
+            for endpoint in endpoints:
+                try:
+                    samples = []
+                    for _ in range(cls.samples_per_sync):
+                        sample = await cls.sample_server_time(session, endpoint)
+                        if sample:
+                            samples.append(sample)
+                    if samples:
+                        cls.apply_sample(*min(samples, key=lambda sample: sample[2]))
+                        return
+                except Exception as e:
+                    logger.error(f"Attempt {attempt + 1}: Failed to fetch server time from {endpoint}: {e}")
+                    await asyncio.sleep(1)  # Pause for 1 second before retrying
 
         cls.is_initialized = False
         logger.error("Failed to update server timestamp from all endpoints. Using local time instead.")
-        cls.offset = 0  # Fallback to local system time
+        if cls.anchor is None:
+            cls.anchor = (time.time() * 1000, time.monotonic(), 0.0)  # Fallback to local system time
+
+    @classmethod
+    def apply_sample(cls, server_ms, received, rtt):
+        drift = 0.0
+        if cls.anchor is not None and cls.is_initialized:
+            elapsed_ms = (received - cls.anchor[1]) * 1000
+            if elapsed_ms >= 60000:
+                error = server_ms - cls.now(received)
+                drift = max(-cls.max_drift, min(cls.max_drift, cls.anchor[2] + error / elapsed_ms))
+        cls.anchor = (server_ms, received, drift)
+        cls.is_initialized = True
+        logger.info(f"Updated server timestamp: {int(server_ms)} (rtt {rtt * 1000:.1f}ms, drift {drift * 1e6:.1f}ppm)")
 
     @classmethod
     async def maintain_timestamp(cls):
         while True:
-            await cls.fetch_server_time()
             await asyncio.sleep(cls.sync_interval)
+            await cls.fetch_server_time()
 
     @classmethod
-    async def ensure_initialized(cls):
-        if not cls.is_initialized:
-            await cls.fetch_server_time()
+    async def start(cls):
+        """Sync once and start the background refresh; call at boot, safe to call again.
+
+        Concurrent callers wait on the same first sync. is_started is only set once
+        a sync succeeded, so a failed one is retried by the next call.
+        """
+        if cls.is_started:
+            return
+        if cls._first_sync is None:
+            cls._first_sync = asyncio.ensure_future(cls.fetch_server_time())
+        try:
+            await asyncio.shield(cls._first_sync)
+        finally:
+            cls._first_sync = None
+        if cls._maintainer is None:
+            cls._maintainer = asyncio.create_task(cls.maintain_timestamp())
+        if cls.is_initialized:
+            cls.is_started = True
 
     @classmethod
-    async def ensure_maintenance_task_started(cls):
-        if not cls.is_maintenance_task_started:
-            cls.is_maintenance_task_started = True
-            asyncio.create_task(cls.maintain_timestamp())
+    def start_in_background(cls):
+        if cls.is_started or cls._first_sync is not None:
+            return
+        try:
+            asyncio.get_running_loop().create_task(cls.start())
+        except RuntimeError:
+            pass
 
-async def get_server_timestamp():
-    await ServerTimestampCache.ensure_initialized()
-    await ServerTimestampCache.ensure_maintenance_task_started()
-    if ServerTimestampCache.offset is None:
-        logger.error("Server timestamp offset is not initialized. Using local time.")
+def server_timestamp():
+    """Current Binance server time in ms; a plain call, safe on the signing hot path."""
+    now = ServerTimestampCache.now()
+    if now is None:
+        ServerTimestampCache.start_in_background()
         return int(time.time() * 1000)
-    return int(time.time() * 1000) + ServerTimestampCache.offset
\ No newline at end of file
+    return int(now)
+
+async def get_server_timestamp():
+    await ServerTimestampCache.start()
+    return server_timestamp()
@@ -1,8 +1,23 @@
 import aiosqlite
 import asyncio
+import contextvars
 import logging
+from contextlib import asynccontextmanager
 from prettytable import PrettyTable
 logger = logging.getLogger(__name__)
+
+# A dispatched order handler holds one pooled connection while it runs, so the pool
+# covers binance_dispatcher's MAX_CONCURRENT_ORDERS plus the reconciler's sweep.
+DB_POOL_SIZE = 18
+DB_PRAGMAS = (
+    "PRAGMA journal_mode=WAL",
+    "PRAGMA synchronous=NORMAL",
+    "PRAGMA busy_timeout=5000",
+    "PRAGMA temp_store=MEMORY",
+    "PRAGMA cache_size=-16000",
+    "PRAGMA mmap_size=134217728",
+)
+
 async def create_connection(db_file, num_retries=3, delay_seconds=5):
     logger.debug("Inside async_create_connection function")
     conn = None
@@ -17,6 +32,96 @@ async def create_connection(db_file, num_retries=3, delay_seconds=5):
             retries += 1
     logger.error("Max retries reached. Could not establish the database connection.")
     return None
+
+class ConnectionPool:
+    """Long-lived aiosqlite connections shared by every task in the process."""
+
+    def __init__(self, db_file, size=DB_POOL_SIZE):
+        self.db_file = db_file
+        self.size = size
+        self._idle = asyncio.Queue()
+        self._connections = []
+        self._init_lock = asyncio.Lock()
+        self.is_initialized = False
+
+    async def initialize(self):
+        async with self._init_lock:
+            if self.is_initialized:
+                return
+            for _ in range(self.size):
+                conn = await create_connection(self.db_file)
+                if conn is None:
+                    raise ConnectionError(f"Could not open pooled connection to {self.db_file}")
+                for pragma in DB_PRAGMAS:
+                    await conn.execute(pragma)
+                self._connections.append(conn)
+                self._idle.put_nowait(conn)
+            self.is_initialized = True
+            logger.info(f"Opened {self.size} pooled connections to {self.db_file}")
+
+    @asynccontextmanager
+    async def connection(self):
+        if not self.is_initialized:
+            await self.initialize()
+        conn = await self._idle.get()
+        try:
+            yield conn
+        finally:
+            if conn.in_transaction:
+                await conn.rollback()
+            self._idle.put_nowait(conn)
+
+    @asynccontextmanager
+    async def transaction(self):
+        """Yield a pooled connection and commit once on success, roll back on error."""
+        async with self.connection() as conn:
+            async with unit_of_work(conn):
+                yield conn
+
+    async def close(self):
+        for conn in self._connections:
+            await conn.close()
+        self._connections.clear()
+        self._idle = asyncio.Queue()
+        self.is_initialized = False
+
+# Connection whose commit is owned by an enclosing unit of work, if any.
+_unit_of_work_conn = contextvars.ContextVar('unit_of_work_conn', default=None)
+
+@asynccontextmanager
+async def unit_of_work(conn):
+    """Buffer every write on conn made inside the block and commit once at the end."""
+    if _unit_of_work_conn.get() is conn:
+        yield conn
+        return
+    token = _unit_of_work_conn.set(conn)
+    try:
+        yield conn
+        await conn.commit()
+    except Exception:
+        await conn.rollback()
+        raise
+    finally:
+        _unit_of_work_conn.reset(token)
+
+async def commit_if_needed(conn):
+    """Commit now unless an enclosing unit of work will commit conn later."""
+    if _unit_of_work_conn.get() is not conn:
+        await conn.commit()
+
+_pools = {}
+
+def get_pool(db_file, size=DB_POOL_SIZE):
+    pool = _pools.get(db_file)
+    if pool is None:
+        pool = _pools[db_file] = ConnectionPool(db_file, size)
+    return pool
+
+async def close_pools():
+    for pool in _pools.values():
+        await pool.close()
+    _pools.clear()
+
 def handle_error(e, message_prefix):
     if isinstance(e, Exception):
         logger.error(f"Database error: {e}")
@@ -25,7 +130,7 @@ def handle_error(e, message_prefix):
 async def execute_and_commit(conn, sql, params=None):
     try:
         cursor = await conn.execute(sql, params)
-        await conn.commit()
+        await commit_if_needed(conn)
         await cursor.close()
     except Exception as e:
         handle_error(e, "Exception in execute_and_commit")
@@ -47,14 +152,21 @@ async def print_table_contents(conn, table_name):
         except Exception as e:
             print(f"Error reading from table {table_name}: {e}")
 
+async def column_exists(conn, table_name, column_name):
+    if not table_name.isidentifier():
+        raise ValueError(f"Invalid table name: {table_name}")
+    async with conn.execute(f"PRAGMA table_info({table_name})") as cursor:
+        return any(column[1] == column_name for column in await cursor.fetchall())
+
 async def add_column_if_not_exists(conn, table_name, column_name, data_type, default_value):
-    try:
-        await conn.execute(
-            f"ALTER TABLE {table_name} ADD COLUMN {column_name} {data_type} DEFAULT {default_value}"
-        )
-        await conn.commit()
-    except aiosqlite.OperationalError:
-        pass
+    """Add a column unless it is already there; any other failure propagates. Does not commit."""
+    if await column_exists(conn, table_name, column_name):
+        return False
+    await conn.execute(
+        f"ALTER TABLE {table_name} ADD COLUMN {column_name} {data_type} DEFAULT {default_value}"
+    )
+    logger.info(f"Added column {table_name}.{column_name}")
+    return True
 
 async def clear_table(conn, table_name):
     # Validate the table_name to ensure it's a safe and valid identifier
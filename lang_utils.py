@@ -9,12 +9,12 @@ logger = logging.getLogger(__name__)
 # Language determination function
 def determine_language(order_details):
     lang_mappings = {'MXN': 'es', 'USD': 'en'}
-    return lang_mappings.get(order_details.get('fiat_unit', 'en'))
+    return lang_mappings.get(order_details.fiat_unit)
 
 # Async function to get menu for an order
 async def get_menu_for_order(order_details):
     language = determine_language(order_details)
-    return get_menu_by_language(language, order_details.get('order_status'))
+    return get_menu_by_language(language, order_details.order_status)
 
 # Async function to get default reply
 async def get_default_reply(order_details):
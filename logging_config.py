@@ -1,5 +1,10 @@
 import logging
 import os
+import tempfile
+
+# The bot's own machine logs to its Documents folder. Anywhere else (tests, other OSes) that
+# path would be created relative to the working directory, so logs go to the temp directory.
+DEFAULT_LOG_DIR = os.getenv('BPA_LOG_DIR') or ('C:/Users/p7016/Documents/bpa' if os.name == 'nt' else os.path.join(tempfile.gettempdir(), 'bpa'))
 
 class UTF8SafeStreamHandler(logging.StreamHandler):
     def emit(self, record):
@@ -10,7 +15,7 @@ class UTF8SafeStreamHandler(logging.StreamHandler):
         stream.write(self.terminator)
         self.flush()
 
-def setup_logging(log_filename='application.log', log_level=logging.INFO, log_dir='C:/Users/p7016/Documents/bpa'):
+def setup_logging(log_filename='application.log', log_level=logging.INFO, log_dir=DEFAULT_LOG_DIR):
     """
     Set up logging configuration.
 
@@ -1,6 +1,5 @@
 import asyncio
-import aiohttp
-from ads_database import fetch_all_ads_from_database, update_ad_in_database
+from ads_database import fetch_all_ads_from_database, update_ads_in_database, ads_repository
 from common_vars import ads_dict
 from credentials import credentials_dict
 from binance_api import BinanceAPI
@@ -14,54 +13,59 @@ advNo_to_fiat = {ad['advNo']: ad['fiat'] for _, ads in ads_dict.items() for ad i
 advNo_to_transAmount = {ad['advNo']: ad['transAmount'] for _, ads in ads_dict.items() for ad in ads}
 
 
+# The client's token bucket paces the calls; this only caps how many are in flight.
+MAX_CONCURRENT_AD_DETAILS = 8
+
 async def populate_ads_with_details():
     api_instances = {}
-    async with aiohttp.ClientSession() as session:
-        try:
-            ads_info = await fetch_all_ads_from_database()
-            logger.debug(f"Fetched ads from database: {ads_info}")
-            
-            tasks = []
-            for i, ad_info in enumerate(ads_info):
-                account = ad_info['account']
-                if account not in api_instances:
-                    KEY = credentials_dict[account]['KEY']
-                    SECRET = credentials_dict[account]['SECRET']
-                    api_instance = BinanceAPI(KEY, SECRET, session)
-                    api_instances[account] = api_instance
-                tasks.append(asyncio.create_task(delayed_process(i * 2, ad_info, api_instances[account])))
-            await asyncio.gather(*tasks)
-        finally:
-            for api_instance in api_instances.values():
-                await api_instance.close_session()
-async def delayed_process(delay, ad_info, api_instance):
-    """Wait for the specified delay and then process the ad."""
-    await asyncio.sleep(delay)
-    await process_ad(ad_info, api_instance)
+    ads_info = await fetch_all_ads_from_database()
+    logger.debug(f"Fetched ads from database: {ads_info}")
 
-async def process_ad(ad_info, api_instance):
-    advNo = ad_info['advNo']
-    ad_details = await api_instance.get_ad_detail(advNo)
-    logger.debug(f"Ad details fetched from BinanceAPI for advNo {advNo}: {ad_details}")
+    semaphore = asyncio.Semaphore(MAX_CONCURRENT_AD_DETAILS)
+    tasks = []
+    for ad_info in ads_info:
+        account = ad_info.account
+        if account not in api_instances:
+            KEY = credentials_dict[account]['KEY']
+            SECRET = credentials_dict[account]['SECRET']
+            api_instances[account] = BinanceAPI(KEY, SECRET)
+        tasks.append(process_ad(ad_info, api_instances[account], semaphore))
+    updates = [update for update in await asyncio.gather(*tasks) if update]
+    await update_ads_in_database(updates)
+    logger.info(f"Hydrated {len(updates)} of {len(ads_info)} ads with details")
 
-    if ad_details and advNo in advNo_to_target_spot:
-        # Update target_spot, fiat, and transAmount using the mappings
-        ad_details['target_spot'] = advNo_to_target_spot[advNo]
-        fiat = advNo_to_fiat.get(advNo)
-        transAmount = advNo_to_transAmount.get(advNo)
+async def process_ad(ad_info, api_instance, semaphore):
+    """Fetch one ad's details and return its update for update_ads_in_database, or None."""
+    advNo = ad_info.advNo
+    try:
+        async with semaphore:
+            ad_detail = await api_instance.fetch_ad_detail(advNo)
+    except Exception as e:
+        logger.error(f"Failed to fetch details for advNo {advNo}: {e}")
+        return None
+    logger.debug(f"Ad details fetched from BinanceAPI for advNo {advNo}: {ad_detail}")
 
+    if ad_detail is not None and advNo in advNo_to_target_spot:
+        # Update target_spot, fiat, and transAmount using the mappings
         logger.debug(f"Updated target_spot for advNo {advNo} to {advNo_to_target_spot[advNo]}")
-        await update_ad_in_database(
-            target_spot=ad_details['target_spot'],
-            advNo=advNo,
-            asset_type=ad_details['data']['asset'],
-            floating_ratio=ad_details['data']['priceFloatingRatio'],
-            price=ad_details['data']['price'],
-            surplusAmount=ad_details['data']['surplusAmount'],
-            account=ad_info['account'],
-            fiat=fiat,
-            transAmount=transAmount
-        )
+        return {
+            'target_spot': advNo_to_target_spot[advNo],
+            'advNo': advNo,
+            'asset_type': ad_detail.asset_type,
+            'floating_ratio': ad_detail.floating_ratio,
+            'price': ad_detail.price,
+            'surplusAmount': ad_detail.surplused_amount,
+            'account': ad_info.account,
+            'fiat': advNo_to_fiat.get(advNo),
+            'transAmount': advNo_to_transAmount.get(advNo),
+        }
+    return None
+
+async def main():
+    try:
+        await populate_ads_with_details()
+    finally:
+        await ads_repository.close()
 
 if __name__ == "__main__":
-    asyncio.run(populate_ads_with_details())
+    asyncio.run(main())